@@ -0,0 +1,137 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Per-year statistics kept for every cell of a dataset's aggregate cube, as quantiles of the values
+# of the cell's rows
+STATISTICS = {"p5": 0.05, "p25": 0.25, "median": 0.5, "p75": 0.75, "p95": 0.95}
+
+# Handling of missing values: skipped (the median charts) or counted as 0 (the trend charts)
+FILLS = (None, 0)
+
+
+# Function to identify a set of rows by its ascending positions in the dataset
+def rows_key(rows):
+    return hashlib.blake2b(np.asarray(rows, dtype=np.int64).tobytes(), digest_size=16).hexdigest()
+
+
+# Function to order every year of a year matrix (years x rows) by value, missing values last
+def value_order(matrix):
+    return np.argsort(matrix, axis=1, kind="stable")
+
+
+# Function to compute the statistics of every group of rows of a year matrix (years x rows, the
+# layout pandas keeps the year block in) in one vectorised pass, skipping missing values. Each year
+# is sorted by group and then by value (missing values last; order reuses a value_order of the
+# matrix), and each quantile is interpolated linearly between its two closest ranks for all groups
+# and years at once. Returns the sorted group ids and an array of groups x statistics x years (NaN
+# where a group has no value in a year)
+def percentile_bands(matrix, groups=None, order=None):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    years, rows = matrix.shape
+    if groups is None:
+        ids, codes = np.zeros(1, dtype=np.int64), np.zeros(rows, dtype=np.int64)
+    else:
+        ids, codes = np.unique(groups, return_inverse=True)
+    if rows == 0:
+        return ids, np.full((len(ids), len(STATISTICS), years), np.nan)
+    if groups is None:
+        ordered = np.sort(matrix, axis=1)
+    else:
+        # A stable sort of the group codes keeps the value order within each group (small codes
+        # are sorted by radix)
+        order = value_order(matrix) if order is None else order
+        codes = codes.astype(np.int16) if len(ids) <= np.iinfo(np.int16).max else codes
+        within = np.argsort(codes[order], axis=1, kind="stable")
+        ordered = np.take_along_axis(matrix, np.take_along_axis(order, within, axis=1), axis=1)
+    sizes = np.bincount(codes, minlength=len(ids))
+    starts = np.cumsum(sizes) - sizes
+    counts = np.add.reduceat(~np.isnan(ordered), starts, axis=1)
+    last = np.maximum(counts - 1, 0)
+    position = last[None] * np.array(list(STATISTICS.values()))[:, None, None]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, last[None])
+    year = np.arange(years)[None, :, None]
+    low = ordered[year, starts + lower]
+    high = ordered[year, starts + upper]
+    stats = low + (position - lower) * (high - low)
+    stats[:, counts == 0] = np.nan
+    return ids, stats.transpose(2, 0, 1)
+
+
+# Function to compute the per-year statistics of a block of year columns (statistics x years)
+def aggregate_block(block, fill=None):
+    matrix = block.to_numpy(dtype=np.float64).T
+    if fill is not None:
+        matrix = np.where(np.isnan(matrix), fill, matrix)
+    _, stats = percentile_bands(matrix)
+    return pd.DataFrame(stats[0], index=list(STATISTICS), columns=block.columns)
+
+
+# Function to list the row groupings the cube is precomputed for, as one group id per row: the
+# whole dataset, every value of every dimension column and every (value, Unit) pair
+def cube_groupings(index):
+    groupings = [np.zeros(index["rows"], dtype=np.int64)]
+    unit = index["columns"].get("Unit")
+    for col, entry in index["columns"].items():
+        keys = entry["keys"].astype(np.int64)
+        groupings.append(keys)
+        if unit is not None and col != "Unit":
+            groupings.append(keys * len(unit["ids"]) + unit["keys"])
+    return groupings
+
+
+# Function to build the aggregate cube of a dataset version: the statistics of every year for each
+# cell (a set of rows that common filter selections leave), under each handling of missing values,
+# one grouping at a time (years is the dataset's year axis). Cells are keyed by their rows, so any
+# selection that leaves the same rows finds them
+def build_cube(df, index, years, version):
+    matrix = df[years.tolist()].to_numpy(dtype=np.float64).T
+    blocks = {fill: matrix if fill is None else np.where(np.isnan(matrix), fill, matrix) for fill in FILLS}
+    orders = {fill: value_order(block) for fill, block in blocks.items()}
+    cells, values = {}, {fill: [] for fill in FILLS}
+    for group in cube_groupings(index):
+        order = np.argsort(group, kind="stable")
+        ids, starts = np.unique(group[order], return_index=True)
+        keys = {}
+        for i, start, end in zip(ids, starts, np.append(starts[1:], len(order))):
+            key = rows_key(order[start:end])
+            if key not in cells:
+                keys[i] = key
+        if not keys:
+            continue
+        for fill, block in blocks.items():
+            _, stats = percentile_bands(block, group, orders[fill])
+            values[fill].append(stats[np.searchsorted(ids, list(keys))])
+        for key in keys.values():
+            cells[key] = len(cells)
+    return {
+        "version": version,
+        "years": years,
+        "cells": cells,
+        "values": {fill: np.concatenate(parts) if parts else np.empty((0, len(STATISTICS), len(years)))
+                   for fill, parts in values.items()},
+    }
+
+
+# Function to compute the statistics of rows that are not a cell of the cube, once per dataset
+# version, set of rows, years and fill (the block itself is left out of the cache key)
+@st.cache_data(max_entries=256, show_spinner=False)
+def memo_aggregates(version, key, year_columns, fill, _block):
+    return aggregate_block(_block, fill)
+
+
+# Function to get the per-year statistics (statistics x years) of a frame's rows, a row subset of
+# the dataset as filtered for a chart: looked up in the cube when they are one of its cells and
+# otherwise computed on demand and memoised
+def pathway_aggregates(df, cube, year_columns, fill=None):
+    year_columns = list(year_columns)
+    if cube is None:
+        return aggregate_block(df[year_columns], fill)
+    key = rows_key(df.index.to_numpy())
+    cell = cube["cells"].get(key)
+    if cell is None:
+        return memo_aggregates(cube["version"], key, tuple(year_columns), fill, df[year_columns])
+    positions = np.searchsorted(cube["years"], year_columns)
+    return pd.DataFrame(cube["values"][fill][cell][:, positions], index=list(STATISTICS), columns=year_columns)
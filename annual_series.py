@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Interpolation between the points of a pathway: straight lines between values, or straight
+# lines between their logarithms (a constant annual rate of change). Log-linear falls back to
+# linear between points that are not both positive (pathways that reach or cross zero)
+METHODS = ("linear", "log-linear")
+
+
+# Function to annualise a year matrix (years x rows, years ascending) in one vectorised pass:
+# every year from the first to the last source year is interpolated, for all rows at once,
+# between the closest points of the row that have a value on either side (so gaps in a row are
+# bridged, and years before its first or after its last value stay NaN). Returns the annual
+# years and an array of annual years x rows
+def interpolate_annual(matrix, years, method="linear"):
+    if method not in METHODS:
+        raise ValueError(f"Unknown interpolation method: {method}")
+    matrix = np.asarray(matrix, dtype=np.float64)
+    years = np.asarray(years, dtype=np.int64)
+    if len(years) == 0:
+        return years, np.empty((0, matrix.shape[1]))
+    annual = np.arange(years[0], years[-1] + 1, dtype=np.int64)
+    valid = ~np.isnan(matrix)
+    # For every source year and row, the last source year at or before it with a value and the
+    # first one at or after it (-1 and len(years) where there is none)
+    steps = np.arange(len(years))[:, None]
+    before = np.maximum.accumulate(np.where(valid, steps, -1), axis=0)
+    after = np.minimum.accumulate(np.where(valid, steps, len(years))[::-1], axis=0)[::-1]
+    low = before[np.searchsorted(years, annual, side="right") - 1]
+    high = after[np.searchsorted(years, annual, side="left")]
+    missing = (low < 0) | (high >= len(years))
+    low, high = np.clip(low, 0, len(years) - 1), np.clip(high, 0, len(years) - 1)
+    span = years[high] - years[low]
+    weight = np.divide(annual[:, None] - years[low], span, out=np.zeros(span.shape), where=span > 0)
+    start = np.take_along_axis(matrix, low, axis=0)
+    end = np.take_along_axis(matrix, high, axis=0)
+    values = start + weight * (end - start)
+    if method == "log-linear":
+        positive = (start > 0) & (end > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(positive, start * np.power(end / start, weight), values)
+    values[missing] = np.nan
+    return annual, values
+
+
+# Function to build the annual series of a dataset version: every row interpolated to every year
+# of its year axis (years) with one method, as a read-only float64 array of annual years x rows
+# (the precision of the values users see, as in the dataset's year block)
+def build_annual(df, years, version, method="linear"):
+    annual, values = interpolate_annual(df[years.tolist()].to_numpy(dtype=np.float64).T, years, method)
+    values.flags.writeable = False
+    return {"version": version, "method": method, "years": annual, "values": values}
+
+
+# Function to look up the values of one year for a set of rows (positions in the dataset, all
+# rows when not given), NaN for a year outside the annual series
+def interim_values(annual, year, rows=None):
+    position = int(year) - int(annual["years"][0]) if len(annual["years"]) else -1
+    if not 0 <= position < len(annual["years"]):
+        return np.full(annual["values"].shape[1] if rows is None else len(rows), np.nan)
+    values = annual["values"][position]
+    return values if rows is None else values[np.asarray(rows)]
+
+
+# Function to compute the linear annual reduction rate of every row between two years: the
+# reduction from start_year to end_year as a share of the start_year value, per year
+def annual_reduction(annual, start_year, end_year, rows=None):
+    start = interim_values(annual, start_year, rows)
+    end = interim_values(annual, end_year, rows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(start != 0, (start - end) / start / (int(end_year) - int(start_year)), np.nan)
+
+
+# Function to get the annual series of a frame's rows (a row subset of the dataset, or rows queried
+# from the pathway database, both labelled by position) as a frame of rows x years, from start_year
+# to end_year (inclusive, either end optional)
+def annual_frame(df, annual, start_year=None, end_year=None):
+    years = annual["years"]
+    start = 0 if start_year is None else np.searchsorted(years, int(start_year), side="left")
+    end = len(years) if end_year is None else np.searchsorted(years, int(end_year), side="right")
+    values = annual["values"][start:end][:, df.index.to_numpy()]
+    return pd.DataFrame(values.T, index=df.index, columns=years[start:end].tolist())
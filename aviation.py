@@ -2,6 +2,6 @@
 import streamlit as st
 
 
-
-st.write("# Under-Construction")
-
+# Function to render the page (called by the page registry on every rerun)
+def render():
+    st.write("# Under-Construction")
@@ -0,0 +1,109 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pyarrow.parquet as pq
+from data_loader import (SNAPSHOT_DIR, csv_extent, is_large_source, read_source, resolve_source, sheet_extent,
+                         snapshot_path, source_catalog, stream_snapshot, workbook_sheet_names, write_snapshot)
+from dataset_registry import page_loads
+from pathway_db import DATASETS
+
+# Compile the snapshots the app reads into Parquet, ahead of the first request: every dataset as
+# the pages load it (sheet, header row and column selection, see PAGE_DATASETS) and every sheet
+# the pathway database is ingested from:
+#   python build_snapshots.py                       (every dataset)
+#   python build_snapshots.py Steel.xlsx FINZ.xlsx  (the datasets of selected sources only)
+#   python build_snapshots.py --workers 4           (size of the process pool)
+# Datasets are converted in parallel, one process each, and each snapshot is checked against the
+# row and column count of its source. Byte-identical sources are only converted once.
+
+
+# Function to list the snapshot jobs, (file_path, sheet, skip_row, columns), once per snapshot
+def snapshot_jobs(files=None):
+    loads = page_loads() + [(info["file_path"], info["sheet"], info.get("skip_row"), None) for info in DATASETS.values()]
+    jobs = {}
+    for file_path, sheet, skip_row, columns in loads:
+        if files and file_path not in files and resolve_source(file_path) not in files:
+            continue
+        source = resolve_source(file_path)
+        if source.endswith(".xlsx") and sheet is None:
+            sheet = workbook_sheet_names(source)[0]
+        jobs.setdefault(snapshot_path(source, sheet, skip_row, columns), (source, sheet, skip_row, columns))
+    return list(jobs.values())
+
+
+# Function to compile one dataset into its snapshot and check it against the source (with a column
+# selection, only the row count can be checked)
+def build_sheet(file_path, sheet=None, skip_row=None, columns=None):
+    start = time.perf_counter()
+    path = snapshot_path(file_path, sheet, skip_row, columns)
+    if is_large_source(file_path):
+        stream_snapshot(file_path, path, sheet, skip_row, columns)
+    else:
+        write_snapshot(read_source(file_path, sheet, skip_row, columns), path)
+    seconds = time.perf_counter() - start
+    metadata = pq.read_metadata(path)
+    rows, width = sheet_extent(file_path, sheet, skip_row) if sheet else csv_extent(file_path, skip_row)
+    expected = (rows, metadata.num_columns if columns else width)
+    return {"rows": metadata.num_rows, "columns": metadata.num_columns, "expected": expected, "seconds": seconds}
+
+
+# Function to name one job in the report: its sheet, header row and column selection
+def job_label(sheet, skip_row, columns):
+    return (f"{sheet or 'csv'}" + (f" (skip {skip_row})" if skip_row else "")
+            + (f" ({len(columns)} columns)" if columns else ""))
+
+
+# Function to describe what went wrong with one job (None when it converted and checks out)
+def check_sheet(label, result):
+    if isinstance(result, Exception):
+        return f"{label}: failed ({result})"
+    if (result["rows"], result["columns"]) != result["expected"]:
+        return (f"{label}: {result['rows']}x{result['columns']} written, "
+                f"{result['expected'][0]}x{result['expected'][1]} in source")
+    return None
+
+
+# Function to run the snapshot jobs in a process pool, one process per job at a time, and collect
+# their results by source and job label ({file_path: {label: result or exception}})
+def build_all(jobs, workers=None):
+    results = {job[0]: {} for job in jobs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_sheet, *job): job for job in jobs}
+        for future in as_completed(futures):
+            file_path, sheet, skip_row, columns = futures[future]
+            try:
+                results[file_path][job_label(sheet, skip_row, columns)] = future.result()
+            except Exception as e:
+                results[file_path][job_label(sheet, skip_row, columns)] = e
+    return results
+
+
+# Function to print one line per source: sheets, rows, conversion time and validation outcome
+def print_table(results):
+    width = max([len(file_path) for file_path in results] + [4])
+    print(f"{'File':<{width}}  {'Snapshots':>9}  {'Rows':>9}  {'Seconds':>8}  Check")
+    for file_path, sheets in results.items():
+        converted = [result for result in sheets.values() if not isinstance(result, Exception)]
+        problems = [problem for sheet, result in sheets.items() if (problem := check_sheet(sheet, result))]
+        rows = sum(result["rows"] for result in converted)
+        seconds = sum(result["seconds"] for result in converted)
+        print(f"{file_path:<{width}}  {len(sheets):>9}  {rows:>9}  {seconds:>8.2f}  {'; '.join(problems) or 'ok'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile workbooks and CSV files into Parquet snapshots.")
+    parser.add_argument("files", nargs="*", help="sources to convert (default: every source in the repo root)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build_all(snapshot_jobs(args.files), args.workers)
+    print_table(results)
+    for paths in source_catalog().values():
+        if len(paths) > 1 and any(path in results for path in paths):
+            print(f"Identical sources, converted once: {', '.join(paths)}")
+    failed = any(check_sheet(label, result) for labels in results.values() for label, result in labels.items())
+    print(f"Snapshots written to {SNAPSHOT_DIR}/ in {time.perf_counter() - start:.2f}s "
+          f"with {args.workers} worker(s){', with errors' if failed else ''}")
+    raise SystemExit(1 if failed else 0)
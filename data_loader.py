@@ -0,0 +1,506 @@
+import csv
+import glob
+import hashlib
+import logging
+import os
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Compiled Parquet snapshots of every workbook sheet live here (see build_snapshots.py).
+# They double as a persistent parse cache that survives server restarts, bounded in size
+SNAPSHOT_DIR = ".snapshots"
+SNAPSHOT_MAX_BYTES = int(os.environ.get("PATHWAY_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Sources at least this large are streamed into their snapshot in row groups rather than parsed
+# whole, buffering at most PATHWAY_INGEST_MAX_MB of cell values at a time
+STREAM_MIN_BYTES = int(os.environ.get("PATHWAY_STREAM_MIN_MB", "32")) * 1024 * 1024
+INGEST_MAX_BYTES = int(os.environ.get("PATHWAY_INGEST_MAX_MB", "256")) * 1024 * 1024
+CELL_BYTES = 64
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+XLSX_NS = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+XLSX_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+SHEET_DATA = re.compile(rb"<(?:\w+:)?sheetData\s*/>|<(?:\w+:)?sheetData\b[^>]*>.*?</(?:\w+:)?sheetData>", re.S)
+CELL_STYLE = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bs="(\d+)"')
+SHARED_STRING_CELL = re.compile(rb'(<(?:\w+:)?c\b[^>]*\bt="s"[^>]*>\s*<(?:\w+:)?v>)(\d+)(?=<)')
+
+# Suffixes a copy of a source gets next to the original ('Alldata2.xlsx', 'Alldata (1).xlsx',
+# 'Alldata - Copy.xlsx'); a missing source is served by its copies when they are byte-identical
+COPY_SUFFIX = r"(?:\d+| \(\d+\)| - Copy)"
+
+logger = logging.getLogger(__name__)
+
+
+# Function to list the sheet names of a workbook without parsing any sheet data
+def workbook_sheet_names(file_path):
+    with zipfile.ZipFile(file_path) as zf:
+        root = ET.fromstring(zf.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in root.find("main:sheets", XLSX_NS)]
+
+
+# Function to map the sheet names of a workbook to their worksheet parts inside the zip
+def sheet_parts(file_path):
+    with zipfile.ZipFile(file_path) as zf:
+        root = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+    parts = {}
+    for sheet in root.find("main:sheets", XLSX_NS):
+        target = targets[sheet.get(XLSX_REL)]
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+
+# Function to turn a cell reference's column letters into a 1-based column number
+def column_number(ref):
+    number = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        number = number * 26 + ord(char.upper()) - ord("A") + 1
+    return number
+
+
+# Function to count the data rows and columns of a sheet from its XML, the way pandas parses it:
+# the header is the first row after skip_row, the data runs to the last row holding a value, and
+# every row is as wide as the widest row of the sheet
+def sheet_extent(file_path, sheet, skip_row=None):
+    row_tag, cell_tag = "{%s}row" % XLSX_NS["main"], "{%s}c" % XLSX_NS["main"]
+    value_tags = {"{%s}v" % XLSX_NS["main"], "{%s}is" % XLSX_NS["main"]}
+    final, width, row_number = 0, 0, 0
+    with zipfile.ZipFile(file_path) as zf, zf.open(sheet_parts(file_path)[sheet]) as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != row_tag:
+                continue
+            row_number = int(elem.get("r", row_number + 1))
+            last = 0
+            for position, cell in enumerate(elem.iter(cell_tag), 1):
+                if any(child.tag in value_tags for child in cell):
+                    last = column_number(cell.get("r")) if cell.get("r") else position
+            if last:
+                final, width = row_number, max(width, last)
+            elem.clear()
+    if final <= (skip_row or 0):
+        # Nothing is left after the skipped rows, not even a header
+        return 0, 0
+    return final - (skip_row or 0) - 1, width
+
+
+# Function to count the data rows and columns of a CSV file (blank lines are not rows)
+def csv_extent(file_path, skip_row=None):
+    with open(file_path, encoding="utf-8", newline="") as f:
+        rows = csv.reader(f)
+        for _ in range(skip_row or 0):
+            next(rows, None)
+        header = next(rows, [])
+        return sum(1 for row in rows if row), len(header)
+
+
+file_digests = {}
+
+
+# Function to hash the content of a file (memoised per path, size and mtime)
+def file_digest(file_path):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in file_digests:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        file_digests[key] = digest.hexdigest()
+    return file_digests[key]
+
+
+sheet_digests = {}
+
+
+# Function to read the shared strings table of a workbook (the text of string cells, by index)
+def shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    item_tag, text_tag, phonetic_tag = ("{%s}%s" % (XLSX_NS["main"], tag) for tag in ("si", "t", "rPh"))
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == item_tag:
+                phonetic = {id(t) for run in elem.iter(phonetic_tag) for t in run.iter(text_tag)}
+                strings.append("".join(t.text or "" for t in elem.iter(text_tag) if id(t) not in phonetic))
+                elem.clear()
+    return strings
+
+
+# Function to read the number format of every cell style of a workbook (by cellXfs index): the
+# format id and, for custom formats, the format code
+def number_formats(zf):
+    if "xl/styles.xml" not in zf.namelist():
+        return []
+    root = ET.fromstring(zf.read("xl/styles.xml"))
+    codes = {fmt.get("numFmtId"): fmt.get("formatCode") for fmt in root.iterfind("main:numFmts/main:numFmt", XLSX_NS)}
+    formats = []
+    for xf in root.iterfind("main:cellXfs/main:xf", XLSX_NS):
+        format_id = xf.get("numFmtId", "0")
+        formats.append(f"{format_id}:{codes.get(format_id, '')}")
+    return formats
+
+
+# Function to hash what a sheet parses to: its cell data with string cells resolved to their text
+# (so a rebuilt shared strings table does not matter) and the number formats its cells use, but
+# not the other styles, views, selections or column widths that change on every save
+def hash_sheet(data, strings, formats):
+    match = SHEET_DATA.search(data)
+    data = match.group(0) if match else data
+    used = sorted({int(index) for index in CELL_STYLE.findall(data)})
+    styles = "|".join(f"{i}={formats[i] if i < len(formats) else ''}" for i in used).encode()
+    data = SHARED_STRING_CELL.sub(
+        lambda cell: cell.group(1) + (strings[int(cell.group(2))] if int(cell.group(2)) < len(strings) else "").encode(),
+        data,
+    )
+    return hashlib.sha256(styles + data).hexdigest()
+
+
+# Function to hash every sheet of a workbook separately (memoised per path, size and mtime), so
+# editing one sheet leaves the digests, snapshots and cached frames of the others untouched
+def sheet_digest(file_path, sheet=None):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in sheet_digests:
+        with zipfile.ZipFile(file_path) as zf:
+            strings = shared_strings(zf)
+            formats = number_formats(zf)
+            sheet_digests[key] = {name: hash_sheet(zf.read(part), strings, formats)
+                                  for name, part in sheet_parts(file_path).items()}
+    digests = sheet_digests[key]
+    return digests[sheet] if sheet is not None else next(iter(digests.values()))
+
+
+# Function to identify the content a dataset is parsed from: one sheet of a workbook, or a whole file
+def source_digest(file_path, sheet=None):
+    if file_path.endswith(".xlsx"):
+        return sheet_digest(file_path, sheet)
+    return file_digest(file_path)
+
+
+# Function to check for editor lock files and temporary files that are not real sources
+def is_temp_file(file_path):
+    name = os.path.basename(file_path)
+    return name.startswith(("~$", ".~lock", ".")) or name.endswith((".tmp", "#"))
+
+
+# Function to list the source workbooks and CSV files in a directory
+def source_files(directory="."):
+    paths = glob.glob(os.path.join(directory, "*.xlsx")) + glob.glob(os.path.join(directory, "*.csv"))
+    return sorted(os.path.relpath(path) for path in paths if not is_temp_file(path))
+
+
+# Function to group source files by content hash ({digest: [paths]})
+def source_catalog(directory="."):
+    catalog = {}
+    for path in source_files(directory):
+        catalog.setdefault(file_digest(path), []).append(path)
+    return catalog
+
+
+# Function to list the copies of a source in its directory: sources named like it plus a copy suffix
+def source_copies(file_path):
+    directory, name = os.path.split(file_path)
+    stem, ext = os.path.splitext(name)
+    pattern = re.compile(re.escape(stem) + COPY_SUFFIX + re.escape(ext))
+    return [path for path in source_files(directory or ".") if pattern.fullmatch(os.path.basename(path))]
+
+
+# Function to resolve the path a page asks for to an existing source file. A missing source (the
+# Alldata.xlsx the pages refer to) resolves to its copies when the catalog puts them all under one
+# content digest, the first of them by name; otherwise the path is returned as it is
+def resolve_source(file_path):
+    if os.path.exists(file_path):
+        return file_path
+    copies = source_copies(file_path)
+    catalog = [paths for paths in source_catalog(os.path.dirname(file_path) or ".").values()
+               if set(copies) <= set(paths)]
+    return copies[0] if copies and catalog else file_path
+
+
+# Function to build the snapshot path of a sheet, keyed by the content of that sheet alone so that
+# identical files share it and edits to other sheets keep it (a column selection gets its own)
+def snapshot_path(file_path, sheet=None, skip_row=None, columns=None):
+    if sheet is None and file_path.endswith(".xlsx"):
+        sheet = workbook_sheet_names(file_path)[0]
+    parts = [source_digest(file_path, sheet), sheet, skip_row] + ([",".join(columns)] if columns else [])
+    key = "|".join(map(str, parts))
+    key = hashlib.sha256(key.encode()).hexdigest()[:16]
+    name = "csv" if sheet is None else sheet
+    return os.path.join(SNAPSHOT_DIR, f"{name}__{key}.parquet")
+
+
+# Function to remove the least recently used snapshots until the store fits its size bound
+def evict_snapshots(max_bytes=SNAPSHOT_MAX_BYTES):
+    stats = []
+    for path in glob.glob(os.path.join(SNAPSHOT_DIR, "*.parquet")):
+        try:
+            stats.append((os.stat(path), path))
+        except FileNotFoundError:
+            pass
+    stats.sort(key=lambda item: item[0].st_mtime, reverse=True)
+    total = 0
+    for i, (stat, path) in enumerate(stats):
+        total += stat.st_size
+        # The most recent snapshot is always kept, even on its own over the bound
+        if total > max_bytes and i > 0:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Function to name a per-writer temporary file, so concurrent writers of one snapshot never collide
+def temporary_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+# Function to check whether a column is kept by a selection of label columns (years always are)
+def keeps_column(col, columns=None):
+    return columns is None or col in columns or str(col).isdigit()
+
+
+# Function to declare the column types of a CSV file from its header: years as float64, labels as text
+def csv_column_types(file_path, skip_row=None, columns=None, year_type=pa.float64()):
+    header = pd.read_csv(file_path, encoding="utf-8", skiprows=skip_row, nrows=0).columns
+    return {col: year_type if col.isdigit() else pa.string() for col in header if keeps_column(col, columns)}
+
+
+# Function to set up pyarrow's CSV reader options: explicit types, and blocks small enough to
+# be parsed on all cores (and to stay under the ingest memory ceiling when streaming)
+def csv_options(file_path, skip_row=None, columns=None, year_type=pa.float64()):
+    types = csv_column_types(file_path, skip_row, columns, year_type)
+    return {
+        "read_options": pv.ReadOptions(skip_rows=skip_row or 0, use_threads=True,
+                                       block_size=min(CSV_BLOCK_BYTES, INGEST_MAX_BYTES)),
+        "convert_options": pv.ConvertOptions(column_types=types, include_columns=list(types)),
+    }
+
+
+# Function to read a CSV file with pyarrow's multithreaded reader (year headers as int)
+def read_csv(file_path, skip_row=None, columns=None):
+    try:
+        df = pv.read_csv(file_path, **csv_options(file_path, skip_row, columns)).to_pandas()
+    except pa.ArrowInvalid as e:
+        # Text in a year column does not fit the declared types; fall back to pandas' inference
+        logger.warning("Reading %s with pandas, pyarrow could not parse it: %s", file_path, e)
+        df = pd.read_csv(file_path, encoding="utf-8", skiprows=skip_row)
+        df = df[[col for col in df.columns if keeps_column(col, columns)]]
+    df.columns = [int(col) if str(col).isdigit() else col for col in df.columns]
+    return df
+
+
+# Function to parse the source file itself (Excel or CSV)
+def read_source(file_path, sheet=None, skip_row=None, columns=None):
+    if file_path.endswith(".xlsx"):
+        return pd.read_excel(file_path, engine="openpyxl", sheet_name=sheet or 0, skiprows=skip_row,
+                             usecols=None if columns is None else lambda col: keeps_column(col, columns))
+    elif file_path.endswith(".csv"):
+        return read_csv(file_path, skip_row, columns)
+    return None
+
+
+# Function to check whether a source is large enough to be streamed rather than parsed whole
+def is_large_source(file_path):
+    return os.path.getsize(file_path) >= STREAM_MIN_BYTES
+
+
+# Function to size the row groups of a streamed ingest so one batch stays under the memory ceiling
+def batch_rows(columns):
+    return max(1, INGEST_MAX_BYTES // (CELL_BYTES * max(len(columns), 1)))
+
+
+# Function to name header cells the way pandas does (year headers as int, blanks as 'Unnamed: i',
+# repeated names as 'name.1', 'name.2', ...)
+def header_names(row):
+    names, seen = [], {}
+    for i, value in enumerate(row):
+        if value is None:
+            value = f"Unnamed: {i}"
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        name = str(value)
+        while name in seen:
+            seen[str(value)] += 1
+            name = f"{value}.{seen[str(value)]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+# Function to iterate over a worksheet in batches of rows with openpyxl's read-only mode
+def xlsx_chunks(file_path, sheet=None, skip_row=None, columns=None):
+    sheet = sheet or workbook_sheet_names(file_path)[0]
+    # Every row is as wide as the widest row of the sheet, found by a cheap scan of its XML
+    width = sheet_extent(file_path, sheet, skip_row)[1]
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet]
+        worksheet.reset_dimensions()
+        rows = worksheet.iter_rows(values_only=True)
+        for _ in range(skip_row or 0):
+            next(rows, None)
+        header = tuple(next(rows, ()))[:width]
+        header = header_names(header + (None,) * (width - len(header)))
+        kept = [col for col in header if keeps_column(col, columns)]
+        size, batch, written, blank = batch_rows(header), [], 0, 0
+        for row in rows:
+            # Blank rows are kept between data rows but dropped at the end, as pandas does
+            if all(value is None for value in row):
+                blank += 1
+                continue
+            batch.extend([(None,) * width] * blank)
+            blank = 0
+            batch.append(row[:width] + (None,) * (width - len(row)))
+            if len(batch) >= size:
+                yield pd.DataFrame(batch, columns=header)[kept]
+                written, batch = written + len(batch), []
+        # An empty sheet still yields its header, so the snapshot gets a schema
+        if batch or not written:
+            yield pd.DataFrame(batch, columns=header)[kept]
+    finally:
+        workbook.close()
+
+
+# Function to stream a CSV file into a Parquet file in pyarrow's record batches. With text_years the
+# year columns are read as text and converted batch by batch, text in them becoming null
+def stream_csv(file_path, tmp_path, skip_row=None, columns=None, text_years=False):
+    year_type = pa.string() if text_years else pa.float64()
+    # pyarrow parses each block of the CSV on all cores straight into typed record batches
+    with pv.open_csv(file_path, **csv_options(file_path, skip_row, columns, year_type)) as reader:
+        schema = pa.schema([(field.name, pa.float64() if field.name.isdigit() else field.type) for field in reader.schema])
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for batch in reader:
+                if text_years:
+                    batch = pa.RecordBatch.from_arrays(
+                        [pa.array(pd.to_numeric(column.to_pandas(), errors="coerce"), type=pa.float64())
+                         if name.isdigit() else column for name, column in zip(batch.schema.names, batch.columns)],
+                        schema=schema)
+                writer.write_batch(batch)
+
+
+# Function to stream a source into a Parquet snapshot one row group at a time. Year columns
+# are stored as float64 (text in them becomes null) and every other column as text. A failed
+# stream leaves no temporary file behind
+def stream_snapshot(file_path, path, sheet=None, skip_row=None, columns=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temporary_path(path)
+    try:
+        if file_path.endswith(".csv"):
+            try:
+                stream_csv(file_path, tmp_path, skip_row, columns)
+            except pa.ArrowInvalid as e:
+                # Text in a year column does not fit the declared types
+                logger.warning("Streaming %s with text year columns, pyarrow could not parse it: %s", file_path, e)
+                stream_csv(file_path, tmp_path, skip_row, columns, text_years=True)
+        else:
+            writer = None
+            try:
+                for chunk in xlsx_chunks(file_path, sheet, skip_row, columns):
+                    chunk.columns = [str(col) for col in chunk.columns]
+                    if writer is None:
+                        schema = pa.schema([(col, pa.float64() if col.isdigit() else pa.string()) for col in chunk.columns])
+                        writer = pq.ParquetWriter(tmp_path, schema)
+                    for col in chunk.columns:
+                        if col.isdigit():
+                            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+                        else:
+                            chunk[col] = chunk[col].where(chunk[col].isna(), chunk[col].astype(str))
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            finally:
+                if writer is not None:
+                    writer.close()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_snapshots()
+
+
+# Function to write a parsed sheet as a Parquet snapshot
+def write_snapshot(df, path):
+    df = df.copy()
+    # Parquet needs string headers; year headers are restored to int on read
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns[df.dtypes == object]:
+        # Columns mixing text and numbers (e.g. '##########' in a year column) are kept as text
+        values = df[col].dropna()
+        if values.map(type).nunique() > 1:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = temporary_path(path)
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    evict_snapshots()
+
+
+# Function to read a Parquet snapshot back into the same shape as the Excel parse
+def read_snapshot(path):
+    df = pd.read_parquet(path)
+    try:
+        # Reads refresh the mtime, which orders the LRU eviction
+        os.utime(path)
+    except OSError:
+        pass
+    df.columns = [int(col) if col.isdigit() else col for col in df.columns]
+    return df
+
+
+# Function to read a snapshot from the store (None when it is missing, was just evicted or the
+# store itself is missing)
+def cached_snapshot(path):
+    try:
+        return read_snapshot(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+# Function to snapshot a freshly parsed frame so the next cold load skips the Excel parse
+def write_through(df, path):
+    try:
+        write_snapshot(df, path)
+    except (OSError, ValueError, TypeError):
+        pass
+
+
+# Function to read a dataset, from the snapshot of its current version or from the source file
+# (columns selects the label columns to keep; all year columns are kept)
+def read_dataset(file_path, sheet=None, skip_row=None, columns=None):
+    path = snapshot_path(file_path, sheet, skip_row, columns)
+    df = cached_snapshot(path)
+    if df is None and is_large_source(file_path):
+        stream_snapshot(file_path, path, sheet, skip_row, columns)
+        df = read_snapshot(path)
+    elif df is None:
+        df = read_source(file_path, sheet, skip_row, columns)
+        write_through(df, path)
+    return df
+
+
+# Function to make sure several sheets of a workbook ({sheet: skip_row}) have snapshots, without
+# holding them in memory, and return the paths of those that do. A sheet whose snapshot cannot be
+# written (the store is read-only or full) is left out, for its loader to parse in memory
+def snapshot_sheets(file_path, sheets):
+    paths = {sheet: snapshot_path(file_path, sheet, skip_row) for sheet, skip_row in sheets.items()}
+    stale = {sheet: skip_row for sheet, skip_row in sheets.items() if not os.path.exists(paths[sheet])}
+    if stale and is_large_source(file_path):
+        for sheet, skip_row in stale.items():
+            try:
+                stream_snapshot(file_path, paths[sheet], sheet, skip_row)
+            except OSError:
+                pass
+    elif stale:
+        with pd.ExcelFile(file_path, engine="openpyxl") as workbook:
+            for sheet, skip_row in stale.items():
+                write_through(workbook.parse(sheet, skiprows=skip_row), paths[sheet])
+    return {sheet: path for sheet, path in paths.items() if os.path.exists(path)}
@@ -0,0 +1,455 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+from aggregate_cube import build_cube
+from annual_series import build_annual
+from data_loader import read_dataset, resolve_source, snapshot_path, snapshot_sheets, source_digest
+
+# Declared dtypes of each dataset, keyed by the path and sheet the pages ask for: the dimension
+# columns are stored as categoricals and the year columns as one contiguous float64 matrix
+DATASET_SCHEMAS = {
+    ("Steel.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("Cement.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("Aluminium.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("PulpPaper.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("Oil & Gas.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("Light Industries.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("N2Oandchemical.xlsx", None): ("Category", "Metric", "Unit"),
+    ("Power Sector.xlsx", None): ("Scenario", "Metric", "Unit"),
+    ("FLAG.xlsx", None): ("Commodity", "Region", "Unit"),
+    ("buildings.xlsx", None): ("Target type", "Scope / Emissions boundary", "Unit", "Geography", "Country",
+                               "Building type"),
+    ("Alldata.xlsx", None): ("Model", "Scenario", "Region", "Variable", "Unit"),
+    ("C1-3_summary_2050_variable.csv", None): ("Category", "Model", "Scenario", "Region", "Metric", "Unit"),
+}
+
+# Row partitions derived once per dataset version: {flag: (dimension column, text its normalised
+# key contains)}. Pages select a partition by flag instead of searching the column's text
+DATASET_FLAGS = {
+    ("buildings.xlsx", None): {"is_residential": ("Building type", "residential")},
+}
+
+
+# Datasets behind the pages in app.py, the Reference tab and the Financial Institution tabs, with
+# the arguments the pages load them with (Rail, Road, Aviation and Other Sectors load no data).
+# The warm-up and build_snapshots.py work from them, so they fill the same cache entries and
+# snapshots the pages read
+PAGE_DATASETS = {
+    "Power Generation": {"file_path": "Power Sector.xlsx"},
+    "Light Industries": {"file_path": "Light Industries.xlsx"},
+    "Pulp & Paper": {"file_path": "PulpPaper.xlsx"},
+    "Oil & Gas": {"file_path": "Oil & Gas.xlsx"},
+    "Aluminum Production": {"file_path": "Aluminium.xlsx"},
+    "Residential & Commercial": {"file_path": "buildings.xlsx"},
+    "Cement": {"file_path": "Cement.xlsx"},
+    "Steel": {"file_path": "Steel.xlsx"},
+    "Chemical": {"file_path": "N2Oandchemical.xlsx"},
+    "FLAG": {"file_path": "FLAG.xlsx"},
+    "Apperal & Footwear": {"file_path": "Alldata.xlsx"},
+    "IPCC": {"file_path": "C1-3_summary_2050_variable.csv", "columns": ["Category", "Scenario", "Metric", "Unit"]},
+    "Metrics": {"file_path": "Metrics.xlsx"},
+    "Phase-Out (Reference)": {"file_path": "Phase-Out.xlsx",
+                              "sheets": {"criteria": None, "Phase out dates": 3, "Residuals": 2}},
+    "Phase-Out (Financial Institution)": {"file_path": "Phase-Out.xlsx",
+                                          "sheets": {"Phase out dates": 3, "Residuals": 2}},
+}
+
+
+# Function to list the (file_path, sheet, skip_row, columns) loads behind the page datasets, once each
+def page_loads(datasets=None):
+    loads = []
+    for info in (datasets or PAGE_DATASETS).values():
+        if "sheets" in info:
+            loads += [(info["file_path"], sheet, skip_row, None) for sheet, skip_row in info["sheets"].items()]
+        else:
+            loads.append((info["file_path"], None, None, tuple(info["columns"]) if info.get("columns") else None))
+    return list(dict.fromkeys(loads))
+
+
+# Function to identify a dataset version by the content it is parsed from: one sheet of a workbook
+# or a whole CSV file. Byte-identical sources (Alldata2.xlsx/Alldata3.xlsx) share one parse and one
+# shared copy, and editing one sheet of a workbook leaves the other sheets' copies in place
+def dataset_version(file_path, sheet=None):
+    return source_digest(file_path, sheet)
+
+
+# Function to rebuild a frame on read-only copies of its numpy columns and of the codes of its
+# categorical columns, so a page writing into a shared frame fails (or, with copy-on-write, copies)
+# instead of changing it for every session. Other extension columns are kept as they are
+def freeze_frame(df):
+    columns = {}
+    for i in range(df.shape[1]):
+        values = df.iloc[:, i].array
+        if isinstance(values, pd.arrays.NumpyExtensionArray):
+            values = values.to_numpy(copy=True)
+            values.flags.writeable = False
+        elif isinstance(values, pd.Categorical):
+            codes = values.codes.copy()
+            codes.flags.writeable = False
+            values = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        columns[i] = values
+    frozen = pd.DataFrame(columns, index=df.index, copy=False)
+    frozen.columns = df.columns
+    return frozen
+
+
+# Function to order columns the way apply_schema lays a frame out: the label columns in source
+# order, then the year columns as integers in ascending order
+def schema_columns(columns, dimensions):
+    if dimensions is None:
+        return list(columns)
+    return [col for col in columns if not str(col).isdigit()] + sorted(int(col) for col in columns if str(col).isdigit())
+
+
+# Function to build the year axis of a frame's columns: its year columns as ascending integers and
+# their positions among the columns (a contiguous block for datasets with a declared schema)
+def year_axis(columns):
+    positions = np.array([i for i, col in enumerate(columns) if str(col).isdigit()], dtype=np.int64)
+    years = np.array([int(columns[i]) for i in positions], dtype=np.int64)
+    order = np.argsort(years, kind="stable")
+    return {"years": years[order], "positions": positions[order], "labels": [columns[i] for i in positions[order]]}
+
+
+# Function to slice a year axis to the column labels of the years from start_year to end_year
+# (inclusive, either end optional) by binary search
+def year_range(axis, start_year=None, end_year=None):
+    years = axis["years"]
+    start = 0 if start_year is None else np.searchsorted(years, int(start_year), side="left")
+    end = len(years) if end_year is None else np.searchsorted(years, int(end_year), side="right")
+    return axis["labels"][start:end]
+
+
+# Function to apply a declared schema to a dataset and freeze it: categorical dimensions, then the
+# year columns as one read-only float64 block (the values users see and export, so never downcast)
+# under integer labels in ascending order (text such as '##########' in a year column becomes NaN)
+def apply_schema(df, dimensions):
+    if dimensions is None:
+        return freeze_frame(df)
+    year_columns = sorted((col for col in df.columns if str(col).isdigit()), key=int)
+    labels = df[[col for col in df.columns if not str(col).isdigit()]]
+    labels = freeze_frame(labels.astype({col: "category" for col in dimensions if col in labels.columns}))
+    years = df[year_columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    years.flags.writeable = False
+    years = pd.DataFrame(years, index=df.index, columns=[int(col) for col in year_columns], copy=False)
+    return pd.concat([labels, years], axis=1, copy=False)
+
+
+# Function to normalise one value into the key it is matched on (text, trimmed and casefolded)
+def normalise_key(value):
+    return str(value).strip().casefold()
+
+
+# Function to normalise an array of texts into keys, the vectorised form of normalise_key
+def normalise_keys(labels):
+    return pd.Index(labels, dtype=object).str.strip().str.casefold()
+
+
+# Function to match a column on normalised keys against selected values; categorical columns
+# are matched on their categories once and then by integer code
+def match_values(series, values):
+    values = [normalise_key(v) for v in values]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        hits = normalise_keys(series.cat.categories.astype(str)).isin(values)
+        # Code -1 (missing) looks up the trailing entry, which matches the 'nan' option
+        hits = np.append(hits, "nan" in values)
+        return pd.Series(hits[series.cat.codes.to_numpy()], index=series.index)
+    return pd.Series(normalise_keys(series.astype(str)).isin(values), index=series.index)
+
+
+# Function to flag the summary rows of a frame: rows where any text column contains 'Median'.
+# Categorical columns are tested once per category and numeric columns are skipped
+def median_rows(df):
+    hits = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            found = np.append(series.cat.categories.astype(str).str.contains("Median", regex=False), False)
+            hits |= found[series.cat.codes.to_numpy()]
+        elif not pd.api.types.is_numeric_dtype(series.dtype):
+            hits |= series.astype(str).str.contains("Median", regex=False).to_numpy()
+    return hits
+
+
+# Function to number the normalised keys of a column (missing as 'nan', the way selections are
+# matched): the key id of every row, the key of every id and the text shown for it (its first
+# spelling). Categorical columns are normalised once per category and numbered through their codes
+def value_keys(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = np.append(series.cat.categories.astype(str), "nan").astype(object)
+        ids, values = pd.factorize(normalise_keys(labels))
+        keys = ids[series.cat.codes.to_numpy()]
+    else:
+        labels = series.astype(str).to_numpy(dtype=object)
+        keys, values = pd.factorize(normalise_keys(labels))
+        ids = keys
+    shown = np.empty(len(values), dtype=object)
+    shown[ids[::-1]] = labels[::-1]
+    return keys, np.asarray(values, dtype=object), shown
+
+
+# Function to build the inverted index of a frame. For each dimension column it keeps the key id
+# of every row (the column's normalised keys) and, per key, the ascending row positions holding it
+# (postings, as slices of one stable argsort of the ids) and the position of its first row. Each
+# declared flag is resolved on the keys of its column and stored as a boolean per row, next to
+# is_median, the dataset's own summary rows
+def build_index(df, dimensions, flags=None):
+    index = {"rows": len(df), "columns": {}, "flags": {"is_median": median_rows(df)}}
+    for col in dimensions or ():
+        if col not in df.columns:
+            continue
+        keys, values, labels = value_keys(df[col])
+        keys = keys.astype(np.int32)
+        order = np.argsort(keys, kind="stable").astype(np.int32)
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(keys, minlength=len(values)))])
+        first = np.full(len(values), len(df), dtype=np.int64)
+        present = bounds[1:] > bounds[:-1]
+        first[present] = order[bounds[:-1][present]]
+        index["columns"][col] = {
+            "keys": keys,
+            "ids": {value: i for i, value in enumerate(values)},
+            "labels": labels,
+            "order": order,
+            "bounds": bounds,
+            "first": first,
+        }
+    for flag, (col, text) in (flags or {}).items():
+        entry = index["columns"].get(col)
+        if entry is not None:
+            hits = np.array([text in value for value in entry["ids"]], dtype=bool)
+            index["flags"][flag] = hits[entry["keys"]]
+    return index
+
+
+# Function to list the row positions (ascending) holding any of a column's value ids
+def postings(entry, ids):
+    rows = [entry["order"][entry["bounds"][i]:entry["bounds"][i + 1]] for i in ids]
+    return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int32)
+
+
+# Function to resolve multiselect selections ({column: values}) on indexed columns to the ascending
+# row positions they leave. The candidates are the given rows or else the postings of the most
+# selective column; every other column keeps the candidates whose value id is set in its bitmap
+# of selected ids
+def select_rows(index, selections, rows=None):
+    selected = []
+    for col, values in selections.items():
+        entry = index["columns"][col]
+        ids = sorted({entry["ids"][v] for v in map(normalise_key, values) if v in entry["ids"]})
+        size = int(sum(entry["bounds"][i + 1] - entry["bounds"][i] for i in ids))
+        selected.append((size, entry, ids))
+    selected.sort(key=lambda item: item[0])
+    if rows is None:
+        if not selected:
+            return np.arange(index["rows"], dtype=np.int32)
+        rows = postings(selected[0][1], selected[0][2])
+        selected = selected[1:]
+    for _, entry, ids in selected:
+        bitmap = np.zeros(len(entry["ids"]), dtype=bool)
+        bitmap[ids] = True
+        rows = rows[bitmap[entry["keys"][rows]]]
+    return rows
+
+
+# Function to list the options of every indexed filter column ({column: selected values}) with the
+# number of rows each would leave, given the selections on the other columns ({column: {value:
+# count}}, in order of first appearance). Values no longer reachable are left out unless they are
+# selected; rows restricts the counts to a row subset of the dataset
+def facet_options(index, selections, rows=None):
+    facets = {}
+    for col, values in selections.items():
+        if col not in index["columns"]:
+            continue
+        entry = index["columns"][col]
+        others = {other: v for other, v in selections.items() if other != col and v and other in index["columns"]}
+        if others or rows is not None:
+            counts = np.bincount(entry["keys"][select_rows(index, others, rows)], minlength=len(entry["ids"]))
+        else:
+            counts = np.diff(entry["bounds"])
+        ids = [i for i in np.argsort(entry["first"], kind="stable") if counts[i]]
+        facets[col] = {entry["labels"][i]: int(counts[i]) for i in ids}
+        for value in values:
+            if value not in facets[col]:
+                i = entry["ids"].get(normalise_key(value))
+                facets[col][value] = int(counts[i]) if i is not None else 0
+    return facets
+
+
+# Function to filter a frame by multiselect selections ({column: values}). Columns in the dataset's
+# index are resolved from its postings; any other column is matched value by value. The frame is
+# the dataset as loaded or a row subset of it (whose row labels are positions in the dataset)
+def filter_frame(df, index, selections):
+    selections = {col: values for col, values in selections.items() if values}
+    if index is not None:
+        indexed = {col: values for col, values in selections.items() if col in index["columns"]}
+        if indexed:
+            rows = select_rows(index, indexed)
+            if len(df) == index["rows"]:
+                df = df.take(rows)
+            else:
+                bitmap = np.zeros(index["rows"], dtype=bool)
+                bitmap[rows] = True
+                df = df[bitmap[df.index.to_numpy()]]
+        selections = {col: values for col, values in selections.items() if col not in indexed}
+    for col, values in selections.items():
+        df = df[match_values(df[col], values)]
+    return df
+
+
+# Function to load one shared, read-only copy per dataset version for the whole process
+# (the leading underscore keeps the path out of the cache key)
+@st.cache_resource(max_entries=64, show_spinner=False)
+def shared_dataset(version, sheet, skip_row, columns, dimensions, _file_path):
+    return apply_schema(read_dataset(_file_path, sheet, skip_row, columns), dimensions)
+
+
+# Function to build one inverted index per dataset version over its dimension columns and flags
+@st.cache_resource(max_entries=64, show_spinner=False)
+def shared_index(version, sheet, skip_row, columns, dimensions, flags, _file_path):
+    return build_index(shared_dataset(version, sheet, skip_row, columns, dimensions, _file_path), dimensions, flags)
+
+
+# Function to build one aggregate cube per dataset version. It is built from a copy of the dataset
+# read for the build only: the sector pages query their rows from the pathway database (by row
+# position, as the cube keys its cells), so the process keeps the cube but not the dataset
+@st.cache_resource(max_entries=64, show_spinner=False)
+def shared_cube(version, sheet, skip_row, columns, dimensions, flags, _file_path):
+    df = apply_schema(read_dataset(_file_path, sheet, skip_row, columns), dimensions)
+    return build_cube(df, build_index(df, dimensions, flags), year_axis(df.columns)["years"], version)
+
+
+# Function to annualise every row of a dataset version once per interpolation method, from a copy
+# of the dataset read for the build only (as for its cube)
+@st.cache_resource(max_entries=64, show_spinner=False)
+def shared_annual(version, sheet, skip_row, columns, dimensions, method, _file_path):
+    df = apply_schema(read_dataset(_file_path, sheet, skip_row, columns), dimensions)
+    return build_annual(df, year_axis(df.columns)["years"], version, method)
+
+
+# Function to load full dataset as a cheap view of the shared copy (columns optionally selects
+# the label columns a page needs; year columns are always loaded)
+def load_full_data(file_path, sheet, skip_row, columns=None):
+    try:
+        if not file_path.endswith((".xlsx", ".csv")):
+            return None
+        dimensions = DATASET_SCHEMAS.get((file_path, sheet))
+        columns = tuple(columns) if columns is not None else None
+        file_path = resolve_source(file_path)
+        df = shared_dataset(dataset_version(file_path, sheet), sheet, skip_row, columns, dimensions, file_path)
+        return df.copy(deep=False)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to load the inverted index of a dataset (None when it has no declared dimensions),
+# with its row flags, for the rows load_full_data returns with the same arguments
+def load_index(file_path, sheet, skip_row, columns=None):
+    try:
+        dimensions = DATASET_SCHEMAS.get((file_path, sheet))
+        if dimensions is None:
+            return None
+        flags = DATASET_FLAGS.get((file_path, sheet))
+        columns = tuple(columns) if columns is not None else None
+        file_path = resolve_source(file_path)
+        return shared_index(dataset_version(file_path, sheet), sheet, skip_row, columns, dimensions, flags, file_path)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to load the aggregate cube of a dataset (None when it has no declared dimensions), for
+# the rows load_full_data (or the pathway database) returns with the same arguments
+def load_cube(file_path, sheet, skip_row, columns=None):
+    try:
+        dimensions = DATASET_SCHEMAS.get((file_path, sheet))
+        if dimensions is None:
+            return None
+        flags = DATASET_FLAGS.get((file_path, sheet))
+        columns = tuple(columns) if columns is not None else None
+        file_path = resolve_source(file_path)
+        return shared_cube(dataset_version(file_path, sheet), sheet, skip_row, columns, dimensions, flags, file_path)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to load the annual series of a dataset (None when it has no declared dimensions),
+# interpolated with method ("linear" or "log-linear"), for the rows load_full_data (or the pathway
+# database) returns with the same arguments
+def load_annual(file_path, sheet, skip_row, columns=None, method="linear"):
+    try:
+        dimensions = DATASET_SCHEMAS.get((file_path, sheet))
+        if dimensions is None:
+            return None
+        columns = tuple(columns) if columns is not None else None
+        file_path = resolve_source(file_path)
+        return shared_annual(dataset_version(file_path, sheet), sheet, skip_row, columns, dimensions, method, file_path)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to describe a dataset version: its version, column names (as the shared frame lays them
+# out), year columns with their year axis, and row count. A fresh snapshot answers from its Parquet
+# footer; otherwise the shared frame is loaded (once) instead
+@st.cache_data(max_entries=256, show_spinner=False)
+def dataset_schema(version, sheet, skip_row, columns, dimensions, _file_path):
+    path = snapshot_path(_file_path, sheet, skip_row, columns)
+    if os.path.exists(path):
+        metadata = pq.read_metadata(path)
+        columns = schema_columns([int(col) if col.isdigit() else col for col in metadata.schema.names], dimensions)
+        rows = metadata.num_rows
+    else:
+        df = shared_dataset(version, sheet, skip_row, columns, dimensions, _file_path)
+        columns, rows = list(df.columns), len(df)
+    axis = year_axis(columns)
+    return {"version": version, "columns": columns, "year_columns": axis["years"].tolist(), "year_axis": axis,
+            "rows": rows}
+
+
+# Function to probe a dataset's schema without parsing its source a second time
+def probe_schema(file_path, sheet=None, skip_row=None, columns=None):
+    try:
+        dimensions = DATASET_SCHEMAS.get((file_path, sheet))
+        columns = tuple(columns) if columns is not None else None
+        file_path = resolve_source(file_path)
+        return dataset_schema(dataset_version(file_path, sheet), sheet, skip_row, columns, dimensions, file_path)
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to load several sheets of a workbook ({sheet: skip_row}) as cheap views. Sheets without a
+# snapshot of their current content are parsed together in one pass; each sheet then has its own
+# shared copy, so a changed sheet is re-parsed alone
+def load_sheets(file_path, sheets):
+    try:
+        schemas = {sheet: DATASET_SCHEMAS.get((file_path, sheet)) for sheet in sheets}
+        file_path = resolve_source(file_path)
+        snapshot_sheets(file_path, sheets)
+        return {sheet: shared_dataset(dataset_version(file_path, sheet), sheet, skip_row, None, schemas[sheet],
+                                      file_path).copy(deep=False)
+                for sheet, skip_row in sheets.items()}
+    except FileNotFoundError:
+        st.warning(f"File not found: {file_path}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
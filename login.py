@@ -1,6 +1,8 @@
+import pandas as pd
 import streamlit as st
-import importlib
+from page_registry import render_page
 import base64
+from warmup import start_warmup
 
 # Function to encode image to base64
 def get_base64_image(image_path):
@@ -31,6 +33,14 @@ def login():
         else:
             st.error("Invalid username or password!")
 
+# Copy-on-write makes the views pages take of the shared datasets cheap: filtering, dropping or
+# renaming columns shares the cached arrays until a page actually writes to them
+pd.set_option("mode.copy_on_write", True)
+
+# Load every dataset into the shared caches in the background while the user logs in (the one call
+# of the deployed app; app.py only starts it itself when run directly)
+start_warmup()
+
 if "authenticated" not in st.session_state:
     st.session_state["authenticated"] = False
 
@@ -40,8 +50,6 @@ else:
     module_name = "app"
     if module_name:
         try:
-            spec = importlib.util.spec_from_file_location(module_name, f"{module_name}.py")
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)  
+            render_page(module_name)
         except Exception as e:
             st.error(f"⚠️ Error loading {module_name}: {e}")
\ No newline at end of file
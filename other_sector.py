@@ -1,5 +1,6 @@
 import streamlit as st
 
 
-
-st.write("## Under-construction")
+# Function to render the page (called by the page registry on every rerun)
+def render():
+    st.write("## Under-construction")
@@ -0,0 +1,31 @@
+import importlib
+import os
+import sys
+import streamlit as st
+
+# Pages are imported once per server process and only re-imported when their file changes. Each
+# page module defines its helpers at import time and draws itself in render(), so a rerun calls
+# render() instead of compiling and executing the whole file again.
+
+
+# Function to import a page module once per version of its file (the mtime is part of the key,
+# so saving the file re-imports it on the next rerun)
+@st.cache_resource(max_entries=64, show_spinner=False)
+def page_module(module_name, mtime):
+    module = sys.modules.get(module_name)
+    if module is None:
+        return importlib.import_module(module_name)
+    return importlib.reload(module)
+
+
+# Function to load a page module, re-importing it if its file has changed
+def load_page(module_name):
+    path = f"{module_name}.py"
+    if not os.path.isfile(path):
+        raise ModuleNotFoundError(f"No page named {module_name!r}", name=module_name)
+    return page_module(module_name, os.path.getmtime(path))
+
+
+# Function to render a page through its render() entry point
+def render_page(module_name):
+    load_page(module_name).render()
@@ -0,0 +1,375 @@
+import json
+import os
+import shutil
+import threading
+import time
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+from data_loader import SNAPSHOT_DIR, resolve_source, snapshot_sheets, source_digest, workbook_sheet_names
+from dataset_registry import DATASET_FLAGS, normalise_key
+
+# Embedded DuckDB database holding every pathway workbook behind the sector pages, the Document
+# tab and the Financial Institution (FINZ) tabs: the values as one long table keyed by
+# dataset/model/scenario/region/metric/unit/category/year, and the source label columns of each
+# dataset in a series table of its own. The pages push their filters and year range down as a
+# query and only hold the rows they show; the IPCC CSV, Metrics and Phase-Out sheets are still
+# loaded in memory through the dataset registry. Build or refresh it with:
+#   python pathway_db.py             (re-ingest the datasets whose sheet changed)
+#   python pathway_db.py --rebuild   (re-ingest every dataset)
+# Every build is written to a file of its own (pathways-<build>.duckdb) and a manifest next to it
+# names the current build and the sheet version each dataset was ingested from. DuckDB keeps one
+# database instance per open path, so a connection opened after a rebuild must not reuse the path
+# of the build it replaces.
+DB_PATH = os.path.join(SNAPSHOT_DIR, "pathways.duckdb")
+
+KEY_COLUMNS = ["model", "scenario", "region", "metric", "unit", "category"]
+
+# Source columns each key column is taken from, the first one a dataset has
+KEY_SOURCES = {
+    "model": ["Model"],
+    "scenario": ["Scenario"],
+    "region": ["Region", "Country"],
+    "metric": ["Metric", "Variable", "Commodity", "Target type"],
+    "unit": ["Unit"],
+    "category": ["Category", "Building type"],
+}
+
+# Source sheet of every dataset (None for the first sheet of the workbook)
+DATASETS = {
+    "steel": {"file_path": "Steel.xlsx", "sheet": None},
+    "cement": {"file_path": "Cement.xlsx", "sheet": None},
+    "aluminium": {"file_path": "Aluminium.xlsx", "sheet": None},
+    "pulp_paper": {"file_path": "PulpPaper.xlsx", "sheet": None},
+    "oil_gas": {"file_path": "Oil & Gas.xlsx", "sheet": None},
+    "light_industries": {"file_path": "Light Industries.xlsx", "sheet": None},
+    "chemical": {"file_path": "N2Oandchemical.xlsx", "sheet": None},
+    "power": {"file_path": "Power Sector.xlsx", "sheet": None},
+    "buildings": {"file_path": "buildings.xlsx", "sheet": None},
+    "flag": {"file_path": "FLAG.xlsx", "sheet": None},
+    "alldata": {"file_path": "Alldata.xlsx", "sheet": None},
+    "finz_ngfs": {"file_path": "FINZ.xlsx", "sheet": "FINZ_NGFS"},
+    "finz_oecm": {"file_path": "FINZ.xlsx", "sheet": "FINZ_OECM"},
+}
+
+# Layout of the tables; a change re-ingests every dataset
+DATABASE_FORMAT = 3
+
+build_lock = threading.Lock()
+
+
+# Function to quote a source column name as an SQL identifier
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Function to name the table holding the label columns of a dataset's series
+def series_table(dataset):
+    return quote(f"series_{dataset}")
+
+
+# Function to build the SQL expression of a label column's normalised key (trimmed, case-insensitive,
+# missing as 'nan'), the key filter_frame matches it on in memory
+def key_expression(col):
+    return f"lower(trim(coalesce(CAST({quote(col)} AS VARCHAR), 'nan')))"
+
+
+# Function to ingest one dataset snapshot: its label columns (as typed in the snapshot) into its
+# series table, its row flags into the flag table and its year columns, unpivoted, into the long
+# pathway table. DuckDB reads the Parquet file directly, so the dataset never has to fit in memory
+# as a DataFrame. Missing values are kept as NULL, so series without a numeric value still list
+# their labels. The flags are resolved here, once per dataset version: is_median (any label
+# containing 'Median') and the flags the dataset registry declares for the dataset
+def insert_dataset(con, name, info, path):
+    names = pq.read_schema(path).names
+    year_columns = [col for col in names if col.isdigit()]
+    label_columns = [col for col in names if not col.isdigit()]
+    source = path.replace("'", "''")
+    con.execute(
+        f"CREATE OR REPLACE TABLE {series_table(name)} AS SELECT CAST(file_row_number AS INTEGER) AS series_id"
+        f"{''.join(f', {quote(col)}' for col in label_columns)} FROM read_parquet('{source}', file_row_number = true) "
+        "ORDER BY series_id"
+    )
+
+    medians = [f"coalesce(contains(CAST({quote(col)} AS VARCHAR), 'Median'), false)" for col in label_columns]
+    flags = [("is_median", " OR ".join(medians) or "false", [])]
+    for flag, (col, text) in (DATASET_FLAGS.get((info["file_path"], info["sheet"])) or {}).items():
+        if col in label_columns:
+            flags.append((flag, f"contains({key_expression(col)}, ?)", [text]))
+    for flag, condition, params in flags:
+        con.execute(f"INSERT INTO series_flags SELECT ?, series_id, ? FROM {series_table(name)} WHERE {condition}",
+                    [name, flag] + params)
+
+    sources = {key: next((col for col in cols if col in label_columns), None) for key, cols in KEY_SOURCES.items()}
+    labels = [f"CAST({quote(sources[key])} AS VARCHAR) AS {key}" if sources[key] else f"NULL::VARCHAR AS {key}"
+              for key in KEY_COLUMNS]
+    years = [f"nullif(TRY_CAST({quote(col)} AS DOUBLE), 'NaN'::DOUBLE) AS {quote(col)}" for col in year_columns]
+    # Rows are clustered by metric/scenario so filtered scans skip whole row groups
+    con.execute(
+        f"INSERT INTO pathways WITH wide AS (SELECT CAST(file_row_number AS INTEGER) AS series_id, "
+        f"{', '.join(labels + years)} FROM read_parquet('{source}', file_row_number = true)) "
+        f"SELECT ?, series_id, {', '.join(KEY_COLUMNS)}, CAST(year AS SMALLINT), value "
+        f"FROM wide UNPIVOT INCLUDE NULLS (value FOR year IN ({', '.join(map(quote, year_columns))})) "
+        "ORDER BY metric, scenario, series_id, year",
+        [name],
+    )
+
+
+# Function to remove a dataset from the database
+def delete_dataset(con, name):
+    con.execute("DELETE FROM pathways WHERE dataset = ?", [name])
+    con.execute("DELETE FROM series_flags WHERE dataset = ?", [name])
+    con.execute(f"DROP TABLE IF EXISTS {series_table(name)}")
+
+
+# Function to identify the sheet content a dataset is ingested from, and the table layout (None
+# when its source is not deployed)
+def ingest_version(dataset):
+    try:
+        info = DATASETS[dataset]
+        return f"{DATABASE_FORMAT}:{source_digest(resolve_source(info['file_path']), info['sheet'])}"
+    except FileNotFoundError:
+        return None
+
+
+# Function to identify the sheet content of every dataset
+def dataset_versions():
+    return {name: ingest_version(name) for name in DATASETS}
+
+
+# Function to name the manifest of a database
+def manifest_path(path=DB_PATH):
+    return f"{os.path.splitext(path)[0]}.json"
+
+
+# Function to name the file of a new database build
+def build_file(path=DB_PATH):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{time.time_ns():x}{ext}"
+
+
+# Function to read the manifest of a database: the file of its current build and the versions of
+# the datasets in it ({} when there is no build)
+def read_manifest(path=DB_PATH):
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    database = manifest.get("database") if isinstance(manifest, dict) else None
+    return manifest if database and os.path.isfile(os.path.join(os.path.dirname(path), database)) else {}
+
+
+# Function to record the current build of a database and the versions of the datasets in it
+def write_manifest(database, versions, path=DB_PATH):
+    with open(f"{manifest_path(path)}.tmp", "w") as f:
+        json.dump({"format": DATABASE_FORMAT, "database": os.path.basename(database), "datasets": versions}, f,
+                  indent=1)
+    os.replace(f"{manifest_path(path)}.tmp", manifest_path(path))
+
+
+# Function to get the file of the current build of a database (None when there is none)
+def database_file(path=DB_PATH):
+    manifest = read_manifest(path)
+    return os.path.join(os.path.dirname(path), manifest["database"]) if manifest else None
+
+
+# Function to remove the files of earlier builds (and of a database written before builds had
+# files of their own). A build still open in this process (or, on
+# Windows, in another one) cannot always be removed; it is left for the next build to remove
+def remove_old_builds(current, path=DB_PATH):
+    stem, ext = os.path.splitext(os.path.basename(path))
+    for name in os.listdir(os.path.dirname(path)):
+        earlier = name.startswith(f"{stem}-") and name.endswith((ext, f"{ext}.tmp")) or name == f"{stem}{ext}"
+        if earlier and name != os.path.basename(current):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+
+
+# Function to bring the database up to date as a new build. Datasets whose sheet is unchanged are
+# carried over from the current build; only the changed ones are re-ingested (all of them with
+# rebuild=True or a new table layout). Datasets whose source is not deployed are left out
+def build_database(path=DB_PATH, rebuild=False):
+    versions = dataset_versions()
+    manifest = read_manifest(path)
+    if rebuild or manifest.get("format") != DATABASE_FORMAT:
+        manifest = {}
+    built = manifest.get("datasets", {})
+    stale = {name: info for name, info in DATASETS.items() if built.get(name) != versions[name]}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    database = build_file(path)
+    tmp_path = f"{database}.tmp"
+    if manifest:
+        shutil.copyfile(database_file(path), tmp_path)
+        con = duckdb.connect(tmp_path)
+    else:
+        con = duckdb.connect(tmp_path)
+        con.execute(
+            "CREATE TABLE pathways (dataset VARCHAR, series_id INTEGER, model VARCHAR, scenario VARCHAR, "
+            "region VARCHAR, metric VARCHAR, unit VARCHAR, category VARCHAR, year SMALLINT, value DOUBLE)"
+        )
+        con.execute("CREATE TABLE series_flags (dataset VARCHAR, series_id INTEGER, flag VARCHAR)")
+    for name in set(built) - set(DATASETS):
+        delete_dataset(con, name)
+    ingest = {name: info for name, info in stale.items() if versions[name] is not None}
+    for name in set(stale) - set(ingest):
+        delete_dataset(con, name)
+    for file_path in dict.fromkeys(info["file_path"] for info in ingest.values()):
+        # Changed datasets sharing a workbook (FINZ NGFS/OECM) are snapshotted in one pass
+        source = resolve_source(file_path)
+        datasets = {name: info for name, info in ingest.items() if info["file_path"] == file_path}
+        sheets = {name: info["sheet"] or workbook_sheet_names(source)[0] for name, info in datasets.items()}
+        paths = snapshot_sheets(source, {sheets[name]: info.get("skip_row") for name, info in datasets.items()})
+        for name, info in datasets.items():
+            if sheets[name] not in paths:
+                # The database is ingested from the snapshot, which lives next to it
+                raise OSError(f"Could not write the snapshot of {file_path} [{sheets[name]}] to {SNAPSHOT_DIR}")
+            delete_dataset(con, name)
+            insert_dataset(con, name, info, paths[sheets[name]])
+    con.close()
+    os.replace(tmp_path, database)
+    write_manifest(database, versions, path)
+    remove_old_builds(database, path)
+    return list(stale)
+
+
+# Function to check that the database holds the current version of every dataset
+def database_is_fresh(path=DB_PATH):
+    manifest = read_manifest(path)
+    return manifest.get("format") == DATABASE_FORMAT and manifest.get("datasets") == dataset_versions()
+
+
+# Function to open one read-only connection per database build for the whole process
+@st.cache_resource(max_entries=2, show_spinner=False)
+def database_connection(database):
+    return duckdb.connect(database, read_only=True)
+
+
+# Function to get a cursor on an up-to-date database (built on first use if needed). With a
+# dataset, its source must be deployed
+def database_cursor(dataset=None):
+    with build_lock:
+        if not database_is_fresh():
+            build_database()
+        database = database_file()
+    if dataset is not None and ingest_version(dataset) is None:
+        raise FileNotFoundError(f"File not found: {DATASETS[dataset]['file_path']}")
+    return database_connection(database).cursor()
+
+
+# Function to list the label columns of a dataset, in source order
+def label_columns(cursor, dataset):
+    rows = cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = ? AND column_name != 'series_id' "
+        "ORDER BY ordinal_position", [f"series_{dataset}"]
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+# Function to build the WHERE clause selecting a dataset's series from page filters ({column:
+# values}) and an optional row filter ({"flag": name, "exclude": bool}, see the flag table).
+# Values match on their normalised key, as filter_frame matches them in memory
+def where_clause(dataset, filters=None, row_filter=None):
+    clauses, params = ["true"], []
+    for col, values in (filters or {}).items():
+        if values:
+            clauses.append(f"{key_expression(col)} IN ({', '.join(['?'] * len(values))})")
+            params += [normalise_key(v) for v in values]
+    if row_filter:
+        clauses.append(f"series_id {'NOT ' if row_filter.get('exclude') else ''}IN "
+                       "(SELECT series_id FROM series_flags WHERE dataset = ? AND flag = ?)")
+        params += [dataset, row_filter["flag"]]
+    return " AND ".join(clauses), params
+
+
+# Function to list the values of a dataset column (missing values left out), in order of first
+# appearance among the series the filters select
+def distinct_values(dataset, column, filters=None):
+    where, params = where_clause(dataset, filters)
+    rows = database_cursor(dataset).execute(
+        f"SELECT {quote(column)} FROM {series_table(dataset)} WHERE {where} AND {quote(column)} IS NOT NULL "
+        f"GROUP BY {quote(column)} ORDER BY min(series_id)", params,
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+# Function to list the options of every filter column of a dataset ({column: selected values})
+# with the number of series each would leave, given the selections on the other columns and the
+# row filter ({column: {value: count}}), as facet_options does for an in-memory index: values
+# are grouped by normalised key, shown in their first spelling and listed in order of first
+# appearance; values no longer reachable are left out unless they are selected
+def facet_counts(dataset, selections, row_filter=None):
+    cursor = database_cursor(dataset)
+    columns = label_columns(cursor, dataset)
+    facets = {}
+    for col, values in selections.items():
+        if col not in columns:
+            continue
+        others = {other: v for other, v in selections.items() if other != col and other in columns}
+        where, params = where_clause(dataset, others, row_filter)
+        rows = cursor.execute(
+            f"SELECT {key_expression(col)} AS key, arg_min(coalesce(CAST({quote(col)} AS VARCHAR), 'nan'), series_id), "
+            f"count(*) FILTER (WHERE {where}) FROM {series_table(dataset)} GROUP BY key ORDER BY min(series_id)",
+            params,
+        ).fetchall()
+        facets[col] = {shown: count for _, shown, count in rows if count}
+        counts = {key: count for key, _, count in rows}
+        for value in values:
+            if value not in facets[col]:
+                facets[col][value] = counts.get(normalise_key(value), 0)
+    return facets
+
+
+# Function to list the years available in a dataset
+def dataset_years(dataset):
+    rows = database_cursor(dataset).execute(
+        "SELECT DISTINCT year FROM pathways WHERE dataset = ? ORDER BY year", [dataset]
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+# Function to flag the series of a dataset that carry one of its flags, as a boolean per series
+# (the flags of an in-memory index)
+def dataset_flags(dataset, flag):
+    cursor = database_cursor(dataset)
+    count = cursor.execute(f"SELECT count(*) FROM {series_table(dataset)}").fetchone()[0]
+    hits = np.zeros(count, dtype=bool)
+    hits[cursor.execute("SELECT series_id FROM series_flags WHERE dataset = ? AND flag = ?",
+                        [dataset, flag]).fetchnumpy()["series_id"]] = True
+    return hits
+
+
+# Function to query the series matching page filters (and an optional row filter), returned wide:
+# the dataset's label columns in source order, then the years from start_year to end_year as
+# float64 columns. Rows are labelled by series id, their position in the dataset
+def query_pathways(dataset, filters=None, start_year=None, end_year=None, row_filter=None):
+    cursor = database_cursor(dataset)
+    where, params = where_clause(dataset, filters, row_filter)
+    labels = cursor.execute(f"SELECT * FROM {series_table(dataset)} WHERE {where} ORDER BY series_id", params).df()
+    labels = labels.set_index(labels["series_id"].to_numpy(dtype=np.int64)).drop(columns="series_id")
+    # Keep every dataset year in range as a column, even where the selection has no value
+    years = [year for year in dataset_years(dataset)
+             if (start_year is None or year >= int(start_year)) and (end_year is None or year <= int(end_year))]
+    # Every series has one row per year, so the sorted values reshape into the year block
+    values = cursor.execute(
+        f"SELECT value FROM pathways WHERE dataset = ? AND year BETWEEN ? AND ? AND series_id IN "
+        f"(SELECT series_id FROM {series_table(dataset)} WHERE {where}) ORDER BY series_id, year",
+        [dataset, years[0] if years else 0, years[-1] if years else -1] + params,
+    ).fetchnumpy()["value"]
+    values = np.ma.filled(np.ma.asarray(values, dtype=np.float64), np.nan).reshape(len(labels), len(years))
+    return pd.concat([labels, pd.DataFrame(values, index=labels.index, columns=years)], axis=1)
+
+
+if __name__ == "__main__":
+    import sys
+
+    stale = build_database(rebuild="--rebuild" in sys.argv[1:])
+    print(f"Re-ingested: {', '.join(stale) or 'nothing, every dataset is up to date'}")
+    con = duckdb.connect(database_file(), read_only=True)
+    for name, rows in con.execute("SELECT dataset, count(*) FROM pathways GROUP BY dataset ORDER BY dataset").fetchall():
+        print(f"{name}: {rows} rows")
+    print(f"Database written to {database_file()}")
@@ -0,0 +1,95 @@
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import streamlit as st
+from dataset_registry import normalise_keys
+
+# Results of the queries the pages run (the filtered frame, its Excel export and the figures
+# drawn from it), shared by every session of the server process and bounded in memory: the least
+# recently used results are evicted once the store holds more than PATHWAY_RESULTS_MAX_MB
+RESULTS_MAX_BYTES = int(os.environ.get("PATHWAY_RESULTS_MAX_MB", "128")) * 1024 * 1024
+
+# The hit rate is logged (at debug level) every this many lookups
+REPORT_EVERY = 100
+
+logger = logging.getLogger(__name__)
+
+
+# Function to create the result store once per server process
+@st.cache_resource(show_spinner=False)
+def result_store():
+    return {"entries": OrderedDict(), "bytes": 0, "hits": 0, "misses": 0, "evictions": 0, "lock": threading.Lock()}
+
+
+# Function to key a query by the dataset version, the page (or tab) that runs it, its filter
+# selections (sorted and normalised the way filter_frame matches them; empty selections filter
+# nothing and are left out) and its year range
+def query_key(version, page, selections, start_year=None, end_year=None):
+    filters = tuple(sorted((col, tuple(sorted(set(normalise_keys(values)))))
+                           for col, values in selections.items() if len(values)))
+    return (version, page, filters, start_year, end_year)
+
+
+# Function to estimate the memory a result holds: the frame's columns, the Excel bytes and the
+# arrays behind each figure's traces. The values of text columns are measured one by one, as pandas
+# cannot measure the read-only arrays of a frozen frame
+def result_bytes(result):
+    frame = result["frame"]
+    size = frame.index.memory_usage(deep=True) + len(result["excel"])
+    for col in range(frame.shape[1]):
+        series = frame.iloc[:, col]
+        size += int(series.memory_usage(index=False, deep=series.dtype != object))
+        if series.dtype == object:
+            size += sum(map(sys.getsizeof, series.to_numpy()))
+    for kind, value, *_ in result["elements"]:
+        if kind == "figure":
+            size += sum(np.asarray(trace[attr]).nbytes for trace in value.data for attr in ("x", "y")
+                        if trace[attr] is not None)
+    return size
+
+
+# Function to report the store's hit rate, size and evictions
+def result_stats():
+    store = result_store()
+    with store["lock"]:
+        lookups = store["hits"] + store["misses"]
+        return {"hits": store["hits"], "misses": store["misses"], "hit_rate": store["hits"] / lookups if lookups else 0.0,
+                "entries": len(store["entries"]), "bytes": store["bytes"], "evictions": store["evictions"]}
+
+
+# Function to look up the result of a query, building it (outside the lock, so other queries are
+# not held up) and storing it on a miss. Results larger than the whole bound are not stored
+def cached_result(key, build, max_bytes=RESULTS_MAX_BYTES):
+    store = result_store()
+    with store["lock"]:
+        entry = store["entries"].get(key)
+        if entry is not None:
+            store["entries"].move_to_end(key)
+            store["hits"] += 1
+        else:
+            store["misses"] += 1
+        report = (store["hits"] + store["misses"]) % REPORT_EVERY == 0
+    if report and logger.isEnabledFor(logging.DEBUG):
+        stats = result_stats()
+        logger.debug("Result cache: %.0f%% hit rate over %d lookups, %d results in %.1f MB (%d evicted)",
+                     100 * stats["hit_rate"], stats["hits"] + stats["misses"], stats["entries"],
+                     stats["bytes"] / 1024 / 1024, stats["evictions"])
+    if entry is not None:
+        return entry[0]
+
+    result = build()
+    size = result_bytes(result)
+    if size > max_bytes:
+        return result
+    with store["lock"]:
+        if key not in store["entries"]:
+            store["entries"][key] = (result, size)
+            store["bytes"] += size
+        while store["bytes"] > max_bytes:
+            _, (_, evicted) = store["entries"].popitem(last=False)
+            store["bytes"] -= evicted
+            store["evictions"] += 1
+    return result
@@ -0,0 +1,476 @@
+import streamlit as st
+import pandas as pd
+from io import BytesIO
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from aggregate_cube import pathway_aggregates
+from dataset_registry import facet_options, freeze_frame, load_cube, median_rows, year_axis, year_range
+from pathway_db import dataset_flags, dataset_years, facet_counts, ingest_version, query_pathways
+from result_cache import cached_result, query_key
+
+# Sector pages of app.py (keyed by the page's "file"), all drawn by render_sector(). Each entry
+# names the dataset behind the page (its source and its name in the pathway database), its filters
+# and year handling, an optional row filter (one of the dataset's flags) and how the filtered rows
+# are charted:
+#   trend       one line per row coloured by a series column, optionally with the median of all rows
+#   median      one line per row plus the median of all rows, on fixed chart years
+#   series      one line per row on fixed chart years, optionally only for a single metric value
+#   per_metric  one chart per metric value
+# The median and series charts leave out the dataset's own "Median" rows (its is_median flag).
+# A chart's "multiple_title" is its title when the rows span several metric values (or units).
+SECTORS = {
+    "steel": {
+        "dataset_name": "Steel",
+        "file_path": "Steel.xlsx",
+        "dataset": "steel",
+        "milestone_title": "Key Milestones for Steel sector",
+        "milestone_image": "steel_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": True,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric",
+                  "multiple_title": "Multiple Metric"},
+    },
+    "cement": {
+        "dataset_name": "Cement",
+        "file_path": "Cement.xlsx",
+        "dataset": "cement",
+        "milestone_title": "Key Milestone for Cement Production",
+        "milestone_image": "cement_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric"},
+    },
+    "aluminum_production": {
+        "dataset_name": "Aluminium",
+        "file_path": "Aluminium.xlsx",
+        "dataset": "aluminium",
+        "milestone_title": "Key Milestone for Aluminum production",
+        "milestone_image": "aluminium_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric"},
+    },
+    "pulp_paper": {
+        "dataset_name": "Pulp and paper",
+        "file_path": "PulpPaper.xlsx",
+        "dataset": "pulp_paper",
+        "milestone_title": "Key Milestone for Pulp and Paper",
+        "milestone_image": "pulp_paper_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric",
+                  "multiple_title": "Multiple Metric"},
+    },
+    "oil_gas": {
+        "dataset_name": "Oil and gas",
+        "file_path": "Oil & Gas.xlsx",
+        "dataset": "oil_gas",
+        "milestone_title": "Key Milestone for Oil and Gas Sector",
+        "milestone_image": "oil_gas_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric"},
+    },
+    "light_industries": {
+        "dataset_name": "light industries",
+        "file_path": "Light Industries.xlsx",
+        "dataset": "light_industries",
+        "milestone_title": "Key Milestone For Light Industries",
+        "milestone_image": "light_indus_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Metric"},
+    },
+    "chemical": {
+        "dataset_name": "Chemical",
+        "file_path": "N2Oandchemical.xlsx",
+        "dataset": "chemical",
+        "milestone_title": "Key Milestones for Chemical sector",
+        "milestone_image": "chemical_s1.png",
+        "filter_columns": ["Category", "Metric", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "per_metric", "series": "Category", "metric": "Metric", "title": "Metric Trends Over Time"},
+    },
+    "power_generation": {
+        "dataset_name": "Power Generation",
+        "file_path": "Power Sector.xlsx",
+        "dataset": "power",
+        "milestone_title": "Key Milestone for Power generation",
+        "milestone_image": "power_sector_s1.png",
+        "filter_columns": ["Scenario", "Metric", "Unit"],
+        "apply_year_filter": True,
+        "chart": {"type": "median", "series": "Scenario", "metric": "Metric", "years": list(range(2020, 2051, 5)),
+                  "median": "SBTi Pathway"},
+    },
+    "residential": {
+        "dataset_name": "Residential",
+        "file_path": "buildings.xlsx",
+        "dataset": "buildings",
+        "milestone_title": "Key Milestone for Residential Buildings",
+        "milestone_image": "residential_s1.png",
+        "filter_columns": ["Target type", "Scope / Emissions boundary", "Unit", "Geography", "Country", "Building type"],
+        "apply_year_filter": False,
+        "row_filter": {"flag": "is_residential"},
+        "chart": {"type": "series", "series": "Country", "metric": "Building type", "years": list(range(2030, 2055, 5)),
+                  "single_metric": True},
+    },
+    "commercial": {
+        "dataset_name": "Commercial",
+        "file_path": "buildings.xlsx",
+        "dataset": "buildings",
+        "milestone_title": "Key Milestones for Commercial buildings",
+        "milestone_image": "commercial_s1.png",
+        "filter_columns": ["Target type", "Scope / Emissions boundary", "Unit", "Geography", "Country", "Building type"],
+        "apply_year_filter": False,
+        "row_filter": {"flag": "is_residential", "exclude": True},
+        "chart": {"type": "series", "series": "Country", "metric": "Building type", "years": list(range(2030, 2055, 5))},
+    },
+    "FLAG": {
+        "dataset_name": "FLAG",
+        "file_path": "FLAG.xlsx",
+        "dataset": "flag",
+        "milestone_title": "Key Milestones for Forestry, Land and Agriculture (FLAG) sector",
+        "milestone_image": "flag_sector_s1.png",
+        "filter_columns": ["Commodity", "Region", "Unit"],
+        "apply_year_filter": False,
+        "chart": {"type": "series", "series": "Region", "metric": "Commodity", "years": list(range(2030, 2055, 5)),
+                  "single_metric": True,
+                  "multiple_title": "Multiple Region",
+                  "multiple_message": "You have Multiple Commodities, please select one to view the Chart!"},
+    },
+    "apparel_footwear": {
+        "dataset_name": "Cross-Sector Pathways",
+        "file_path": "Alldata.xlsx",
+        "dataset": "alldata",
+        "milestone_title": "Key Milestones for Apparel and Footwear industry",
+        "milestone_image": "apparel_footwear_s1.png",
+        "filter_columns": ["Scenario", "Variable", "Unit"],
+        "apply_year_filter": True,
+        "chart": {"type": "trend", "series": "Scenario", "metric": "Variable", "median": "SBTi Pathway"},
+    },
+}
+
+
+# Function to filter based on year range, sliced from the dataset's year axis (built from the
+# frame's columns when not given)
+def filter_by_year(df, filter_columns, start_year, end_year, axis=None):
+    axis = axis if axis is not None else year_axis(df.columns)
+    return df[filter_columns + year_range(axis, start_year, end_year)]
+
+
+# Function to convert DataFrame to Excel for download
+def to_excel(df):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False)
+    processed_data = output.getvalue()
+    return processed_data
+
+
+# Function to draw the multiselect of one filter column offering the values of its facet, each with
+# the number of rows it would leave. The counts are part of the widget identity, so a widget whose
+# counts changed is recreated; seeding it with its current value keeps the selection
+def facet_multiselect(container, col, key, counts):
+    return container.multiselect(f"{col}", list(counts), key=key, default=st.session_state.get(key, []),
+                                 format_func=lambda value: f"{value} ({counts[value]})")
+
+
+# Function to draw one multiselect per filter column (keyed by key_format). With the dataset's index,
+# each one offers only the values still reachable given the other selections, with the number of
+# rows they would leave; df is the dataset as loaded or a row subset of it
+def filter_widgets(df, index, filter_columns, key_format="{col}"):
+    cols = st.columns(len(filter_columns))
+    keys = {col: key_format.format(col=col) for col in filter_columns if col in df.columns}
+    facets = {}
+    if index is not None:
+        rows = None if len(df) == index["rows"] else df.index.to_numpy()
+        facets = facet_options(index, {col: st.session_state.get(key, []) for col, key in keys.items()}, rows)
+
+    selected_values = {}
+    for i, col in enumerate(filter_columns):
+        if col not in keys:
+            continue
+        if col in facets:
+            selected_values[col] = facet_multiselect(cols[i], col, keys[col], facets[col])
+        else:
+            options = df[col].astype(str).unique().tolist()
+            selected_values[col] = cols[i].multiselect(f"{col}", options, key=keys[col])
+    return selected_values
+
+
+# Function to draw one multiselect per filter column of a pathway database dataset (keyed by
+# key_format), each offering the values still reachable given the other selections and the row
+# filter, with the number of rows they would leave (counted by the database)
+def database_filter_widgets(dataset, filter_columns, key_format="{col}", row_filter=None):
+    cols = st.columns(len(filter_columns))
+    keys = {col: key_format.format(col=col) for col in filter_columns}
+    facets = facet_counts(dataset, {col: st.session_state.get(key, []) for col, key in keys.items()}, row_filter)
+    return {col: facet_multiselect(cols[i], col, keys[col], facets[col])
+            for i, col in enumerate(filter_columns) if col in facets}
+
+
+# Function to drop the rows of a dataset that hold its own median ("Median" in any column), by its
+# is_median flag (flags are the row flags of the dataset's index or pathway database, None to
+# search the rows' text); df is the dataset as loaded or a row subset of it
+def drop_median_rows(df, flags):
+    if flags is None:
+        return df[~median_rows(df)]
+    return df[~flags["is_median"][df.index.to_numpy()]]
+
+
+# Function to look up the median of the chart rows for each year in the dataset's aggregate cube
+def median_values(df, spec, year_columns, fill=None):
+    cube = load_cube(spec["file_path"], spec.get("sheet"), spec.get("skip_row"), spec.get("columns"))
+    return pathway_aggregates(df, cube, year_columns, fill).loc["median"].to_numpy(dtype=np.float64)
+
+
+# Function to get the colour sequence px.line would use: the px default, else the default template's
+# colorway (Streamlit's template holds placeholders that it maps to the theme colours)
+def line_colors():
+    return (px.defaults.color_discrete_sequence or pio.templates[pio.templates.default].layout.colorway
+            or px.colors.qualitative.D3)
+
+
+# Function to build a line chart straight from a wide year block (rows x years): one trace per
+# series label, in which every row is its own segment sliced from the block (a gap separates the
+# rows instead of joining them). Labels are coloured and listed in order of first appearance, year
+# by year, the way px.line colours a melted frame; extra_lines ((label, values) pairs such as a
+# median) come after the rows. With drop_empty, missing and zero values are left out of the lines;
+# otherwise missing values show as gaps. Without any year there is nothing to draw
+def line_figure(labels, years, values, series, unit, title=None, markers=True, drop_empty=False, extra_lines=()):
+    labels = np.asarray(labels, dtype=object)
+    years = np.asarray(years, dtype=np.float64)
+    values = np.vstack([np.asarray(values, dtype=np.float64).reshape(len(labels), len(years))]
+                       + [np.asarray(line, dtype=np.float64).reshape(1, len(years)) for _, line in extra_lines])
+    labels = np.append(labels, [label for label, _ in extra_lines]).astype(object)
+    kept = ~np.isnan(values) & (values != 0) if drop_empty else np.ones(values.shape, dtype=bool)
+    rows = np.flatnonzero(kept.any(axis=1))
+    first = kept[rows].argmax(axis=1) if len(years) else np.zeros(0, dtype=np.int64)
+    first[rows >= len(labels) - len(extra_lines)] = len(years)
+    groups = {}
+    for row in rows[np.lexsort((rows, first))]:
+        groups.setdefault(labels[row], []).append(row)
+
+    colors = line_colors()
+    traces = []
+    for i, (label, members) in enumerate(groups.items()):
+        members = np.sort(members)
+        gap = np.full((len(members), 1), np.nan)
+        x = np.hstack([np.broadcast_to(years, (len(members), len(years))), gap])
+        y = np.hstack([values[members], gap])
+        shown = np.hstack([kept[members], np.ones((len(members), 1), dtype=bool)])
+        traces.append(go.Scatter(
+            x=x[shown], y=y[shown], name=str(label), legendgroup=str(label), showlegend=True,
+            mode="lines+markers" if markers else "lines",
+            line=dict(color=colors[i % len(colors)], dash="solid"), marker=dict(symbol="circle"),
+            hovertemplate=f"{series}={label}<br>Year=%{{x}}<br>{unit}=%{{y}}<extra></extra>",
+        ))
+    layout = go.Layout(xaxis=dict(title=dict(text="Year")), yaxis=dict(title=dict(text=unit)),
+                       legend=dict(title=dict(text=series), tracegroupgap=0))
+    if title:
+        layout.title = dict(text=title)
+    else:
+        layout.margin = dict(t=60)
+    return go.Figure(data=traces, layout=layout)
+
+
+# Function to chart one line per row coloured by the series column, with the median of all rows
+# when the spec names one (missing values count as 0 in the median; zero and missing values are
+# not drawn)
+def trend_chart(df, flags, spec, year_columns):
+    chart = spec["chart"]
+    values = df[year_columns].to_numpy(dtype=np.float64)
+    shown = df[(~np.isnan(values) & (values != 0)).any(axis=1)]
+    extra_lines = []
+    if chart.get("median"):
+        extra_lines.append((chart["median"], median_values(df, spec, year_columns, fill=0)))
+
+    if shown["Unit"].nunique() == 1:
+        unit = shown["Unit"].dropna().unique()[0]
+    else: unit = 'Unit (Mixed)'
+
+    if shown[chart["metric"]].nunique() == 1:
+        title_val = shown[chart["metric"]].dropna().unique()[0]
+    else: title_val = chart.get("multiple_title", 'Multiple Metrics')
+
+    fig = line_figure(df[chart["series"]], year_columns, values, chart["series"], unit,
+                      title=f'"{title_val}" - Trend Comparison', drop_empty=True, extra_lines=extra_lines)
+    fig.update_xaxes(type="linear")
+    fig.update_layout(height=600, width=1200)
+    if chart.get("median"):
+        fig.update_traces(line=dict(color="black", width=4), selector=dict(name=chart["median"]))
+    return [("figure", fig, {})]
+
+
+# Function to chart one line per row plus the median of all rows, on the spec's chart years
+def median_chart(df, flags, spec, year_columns):
+    chart = spec["chart"]
+    df = drop_median_rows(df, flags)
+    chart_years = [year for year in chart["years"] if year in year_columns]
+    extra_lines = [(chart["median"], median_values(df, spec, chart_years))] if len(df) else []
+
+    shown = df if chart_years else df.iloc[:0]
+    if shown["Unit"].nunique() == 1:
+        unit = shown["Unit"].dropna().unique()[0]
+        metric_name = shown[chart["metric"]].dropna().unique()[0]
+    else:
+        unit = 'Unit (Mixed)'
+        metric_name = chart.get("multiple_title", f"Multiple {chart['metric']}")
+
+    fig = line_figure(df[chart["series"]], chart_years, df[chart_years], chart["series"], unit, title=metric_name,
+                      extra_lines=extra_lines)
+    fig.update_layout(plot_bgcolor="white")
+    fig.update_traces(line=dict(color="black", width=4), selector=dict(name=chart["median"]))
+    fig.update_layout(height=600, width=1200)
+    return [("figure", fig, {})]
+
+
+# Function to chart one line per row on the spec's chart years; with single_metric the chart is
+# only drawn once the filters leave a single metric value
+def series_chart(df, flags, spec, year_columns):
+    chart = spec["chart"]
+    df = drop_median_rows(df, flags)
+    chart_years = [year for year in chart["years"] if year in year_columns]
+    shown = df if chart_years else df.iloc[:0]
+
+    single_metric = shown[chart["metric"]].nunique() == 1
+    if chart.get("single_metric") and not single_metric:
+        return [("write", chart["multiple_message"])] if chart.get("multiple_message") else []
+
+    if single_metric and shown["Unit"].nunique() == 1:
+        unit = shown["Unit"].unique()[0]
+        metric_name = shown[chart["metric"]].unique()[0]
+    else:
+        unit = 'Unit (Mixed)'
+        metric_name = chart.get("multiple_title", f"Multiple {chart['metric']}")
+
+    fig = line_figure(df[chart["series"]], chart_years, df[chart_years], chart["series"], unit, title=metric_name)
+    fig.update_layout(height=600, width=1200)
+    return [("figure", fig, {})]
+
+
+# Function to chart each metric value separately, coloured by the series column
+def per_metric_chart(df, flags, spec, year_columns):
+    chart = spec["chart"]
+    shown = df if year_columns else df.iloc[:0]
+
+    elements = [("title", chart["title"])]
+    for param in shown[chart["metric"]].unique():
+        rows = shown[shown[chart["metric"]] == param]
+        if rows["Unit"].nunique() == 1:
+            unit = rows["Unit"].unique()[0]
+        else: unit = 'Unit (Mixed)'
+
+        fig = line_figure(rows[chart["series"]], year_columns, rows[year_columns], chart["series"], unit,
+                          title=f"{param} - Line Chart by {chart['series']}")
+        fig.update_xaxes(type="linear")
+        elements.append(("figure", fig, {"use_container_width": True}))
+    return elements
+
+
+# Chart builders by chart type. Each returns the elements it would draw (see draw_elements), so a
+# built chart can be kept in the result cache and drawn again
+CHART_BUILDERS = {
+    "trend": trend_chart,
+    "median": median_chart,
+    "series": series_chart,
+    "per_metric": per_metric_chart,
+}
+
+
+# Function to draw the elements a chart builder returns: ("figure", fig, plotly_chart options),
+# ("title", text) or ("write", text)
+def draw_elements(elements):
+    for kind, value, *options in elements:
+        if kind == "figure":
+            st.plotly_chart(value, **options[0])
+        elif kind == "title":
+            st.title(value)
+        else:
+            st.write(value)
+
+
+# Function to list the years of a sector page's dataset in the pathway database (None when it
+# cannot be loaded)
+def load_years(spec):
+    try:
+        return dataset_years(spec["dataset"])
+    except FileNotFoundError:
+        st.warning(f"File not found: {spec['file_path']}. Upload it below if missing.")
+        return None
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+
+
+# Function to run a sector page's query: select the rows (after the page's row filter) and the year
+# range from the pathway database, export them to Excel and build the chart
+def sector_result(spec, selected_values, start_year, end_year):
+    df = query_pathways(spec["dataset"], selected_values, start_year, end_year, spec.get("row_filter"))
+    if spec["apply_year_filter"]:
+        df = filter_by_year(df, spec["filter_columns"], start_year, end_year)
+    year_columns = year_range(year_axis(df.columns))
+    flags = {"is_median": dataset_flags(spec["dataset"], "is_median")}
+    elements = CHART_BUILDERS[spec["chart"]["type"]](df, flags, spec, year_columns)
+    return {"frame": freeze_frame(df), "excel": to_excel(df), "elements": elements}
+
+
+# Function to render a sector page from its spec: milestones, filters, year range, filtered data and chart
+def render_sector(name):
+    spec = SECTORS[name]
+    dataset_name = spec["dataset_name"]
+    filter_columns = spec["filter_columns"]
+
+    year_columns = load_years(spec)
+    if year_columns is None:
+        return
+
+    # Milestone Image
+    st.write(f"### {spec['milestone_title']}")
+    st.image(spec["milestone_image"])
+
+    # Filtering UI, with the options and counts queried from the pathway database
+    st.write("### Filter Data")
+    selected_values = database_filter_widgets(spec["dataset"], filter_columns, row_filter=spec.get("row_filter"))
+
+    # Add year range filters for datasets requiring year filtering
+    start_year, end_year = None, None
+    if spec["apply_year_filter"]:
+        start_year = st.selectbox(
+            "Select Start Year:",
+            options=year_columns,
+            index=0,  # Default to the first year
+            key=f"start_year_{dataset_name}"
+        )
+        end_year = st.selectbox(
+            "Select End Year:",
+            options=year_columns,
+            index=len(year_columns)-1,  # Default to the last year
+            key=f"end_year_{dataset_name}"
+        )
+
+        # Ensure end year is greater than or equal to start year
+        if end_year < start_year:
+            st.error("End Year must be greater than or equal to Start Year.")
+            end_year = start_year
+
+    # Button to show the filtered data and its chart. The query (filters, Excel export and chart)
+    # runs once per dataset version, selection and year range; every session shares its result
+    if st.button("Apply Filters", key=f"apply_filters_{dataset_name}"):
+        key = query_key(ingest_version(spec["dataset"]), name, selected_values, start_year, end_year)
+        result = cached_result(key, lambda: sector_result(spec, selected_values, start_year, end_year))
+
+        st.write(f"### Filtered Data {dataset_name}")
+        st.dataframe(result["frame"].head(100), hide_index=True)
+
+        st.download_button(
+            label="Download Excel",
+            data=result["excel"],
+            file_name=f"{dataset_name}_filtered_data.xlsx",
+            mime="application/vnd.ms-excel",
+            key=f"download_button_{dataset_name}"  # Ensure unique key for download button
+        )
+
+        draw_elements(result["elements"])
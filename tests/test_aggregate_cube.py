@@ -0,0 +1,89 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from aggregate_cube import (FILLS, STATISTICS, aggregate_block, build_cube, pathway_aggregates, percentile_bands, rows_key,
+                            value_order)
+from dataset_registry import build_index, select_rows
+
+QUANTILES = list(STATISTICS.values())
+
+
+# Function to draw a year matrix (years x rows) with ties, missing values and an all-missing year
+def year_matrix(years=6, rows=40, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(years, rows)).round(1)
+    matrix[rng.random((years, rows)) < 0.2] = np.nan
+    matrix[-1] = np.nan
+    return matrix
+
+
+# Function to compute the reference quantiles of every year of a matrix (statistics x years)
+def nanquantiles(matrix):
+    with warnings.catch_warnings():
+        # All-missing years give NaN, which is what the bands hold too
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanquantile(matrix, QUANTILES, axis=1)
+
+
+def test_bands_match_nanquantile():
+    matrix = year_matrix()
+    ids, stats = percentile_bands(matrix)
+    assert ids.tolist() == [0]
+    np.testing.assert_allclose(stats[0], nanquantiles(matrix), equal_nan=True)
+
+
+@pytest.mark.parametrize("reuse_order", [False, True])
+def test_group_bands_match_nanquantile(reuse_order):
+    matrix = year_matrix(rows=60, seed=1)
+    groups = np.random.default_rng(2).choice([7, 3, 11, 5], size=60)
+    # One group without any value
+    matrix[:, groups == 5] = np.nan
+    ids, stats = percentile_bands(matrix, groups, value_order(matrix) if reuse_order else None)
+    assert ids.tolist() == [3, 5, 7, 11]
+    for i, group in enumerate(ids):
+        np.testing.assert_allclose(stats[i], nanquantiles(matrix[:, groups == group]), equal_nan=True)
+
+
+def test_bands_of_single_rows_and_no_rows():
+    ids, stats = percentile_bands(np.array([[1.0, 2.0], [np.nan, 4.0]]), np.array([0, 1]))
+    assert stats.shape == (2, len(STATISTICS), 2)
+    np.testing.assert_array_equal(stats[0], [[1.0, np.nan]] * len(STATISTICS))
+    np.testing.assert_array_equal(stats[1], [[2.0, 4.0]] * len(STATISTICS))
+    _, stats = percentile_bands(np.empty((3, 0)))
+    assert stats.shape == (1, len(STATISTICS), 3) and np.isnan(stats).all()
+
+
+def test_aggregate_block_fills_missing_values():
+    block = pd.DataFrame({2030: [1.0, np.nan, 3.0], 2040: [np.nan, np.nan, 4.0]})
+    skipped = aggregate_block(block)
+    filled = aggregate_block(block, fill=0)
+    assert list(skipped.index) == list(STATISTICS)
+    assert skipped.loc["median"].tolist() == [2.0, 4.0]
+    assert filled.loc["median"].tolist() == [1.0, 0.0]
+
+
+# Function to draw a dataset with two dimensions, a unit and a block of year columns
+def sample_dataset(rows=120, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Scenario": pd.Categorical(rng.choice(["NZ", "CP", "DP"], size=rows)),
+                       "Metric": rng.choice(["Emissions", "Intensity", "Output"], size=rows),
+                       "Unit": rng.choice(["Mt", "t/t"], size=rows)})
+    years = year_matrix(years=5, rows=rows, seed=seed)
+    return pd.concat([df, pd.DataFrame(years.T, columns=[2030, 2035, 2040, 2045, 2050])], axis=1)
+
+
+@pytest.mark.parametrize("fill", FILLS)
+def test_cube_cells_match_direct_aggregates(fill):
+    df = sample_dataset()
+    index = build_index(df, ["Scenario", "Metric", "Unit"])
+    years = np.array([2030, 2035, 2040, 2045, 2050])
+    cube = build_cube(df, index, years, "test")
+    selections = [{}, {"Scenario": ["NZ"]}, {"Metric": ["Output"]}, {"Metric": ["Emissions"], "Unit": ["Mt"]}]
+    for selection in selections:
+        rows = df.iloc[select_rows(index, selection)] if selection else df
+        assert rows_key(rows.index.to_numpy()) in cube["cells"]
+        # Any span of the year axis is looked up too
+        for year_columns in ([2030, 2035, 2040, 2045, 2050], [2035, 2045]):
+            pd.testing.assert_frame_equal(pathway_aggregates(rows, cube, year_columns, fill),
+                                          aggregate_block(rows[year_columns], fill), check_column_type=False)
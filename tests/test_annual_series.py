@@ -0,0 +1,94 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import data_loader
+import dataset_registry
+from annual_series import annual_frame, annual_reduction, build_annual, interim_values, interpolate_annual
+
+YEARS = np.array([2020, 2025, 2030, 2040, 2050])
+
+# Rows x years: a full row, a row with a gap, a row starting late and ending early, a row reaching
+# zero and a row without values
+ROWS = np.array([
+    [100.0, 80.0, 60.0, 30.0, 10.0],
+    [50.0, np.nan, np.nan, 20.0, 5.0],
+    [np.nan, 40.0, 30.0, 10.0, np.nan],
+    [10.0, 5.0, 0.0, 0.0, 0.0],
+    [np.nan, np.nan, np.nan, np.nan, np.nan],
+])
+
+
+# Function to interpolate one row the straightforward way: np.interp between its valid points,
+# NaN outside them
+def interp_row(row, years, annual):
+    valid = ~np.isnan(row)
+    if not valid.any():
+        return np.full(len(annual), np.nan)
+    values = np.interp(annual, years[valid], row[valid])
+    values[(annual < years[valid][0]) | (annual > years[valid][-1])] = np.nan
+    return values
+
+
+def test_linear_matches_interpolating_row_by_row():
+    annual, values = interpolate_annual(ROWS.T, YEARS)
+    assert annual.tolist() == list(range(2020, 2051))
+    expected = np.column_stack([interp_row(row, YEARS, annual) for row in ROWS])
+    np.testing.assert_allclose(values, expected, equal_nan=True)
+    # The source points are kept, and the gaps between them bridged
+    source = values[YEARS - 2020]
+    np.testing.assert_allclose(source[~np.isnan(ROWS.T)], ROWS.T[~np.isnan(ROWS.T)])
+    np.testing.assert_allclose(source[1:3, 1], [42.5, 35.0])
+
+
+def test_log_linear_keeps_a_constant_rate_between_positive_points():
+    annual, values = interpolate_annual(ROWS.T, YEARS, "log-linear")
+    # 100 -> 80 over five years is the same rate every year
+    rates = values[1:6, 0] / values[0:5, 0]
+    np.testing.assert_allclose(rates, np.full(5, 0.8 ** 0.2))
+    # Between points that are not both positive it falls back to linear
+    np.testing.assert_allclose(values[5:11, 3], np.linspace(5.0, 0.0, 6))
+    np.testing.assert_allclose(values[YEARS - 2020][~np.isnan(ROWS.T)], ROWS.T[~np.isnan(ROWS.T)])
+
+
+def test_unknown_method_and_empty_axis():
+    with pytest.raises(ValueError, match="spline"):
+        interpolate_annual(ROWS.T, YEARS, "spline")
+    annual, values = interpolate_annual(np.empty((0, 3)), [])
+    assert len(annual) == 0 and values.shape == (0, 3)
+
+
+def test_lookups_index_the_annual_series():
+    df = pd.DataFrame(ROWS, columns=YEARS.tolist())
+    annual = build_annual(df, YEARS, "v1")
+    assert annual["values"].dtype == np.float64 and not annual["values"].flags.writeable
+    np.testing.assert_allclose(interim_values(annual, 2027), [72.0, 39.5, 36.0, 3.0, np.nan], equal_nan=True)
+    np.testing.assert_allclose(interim_values(annual, 2033, rows=[0, 2]), [51.0, 24.0])
+    assert np.isnan(interim_values(annual, 2060, rows=[0, 1])).all()
+    # Linear annual reduction from 2020 to 2030, as a share of the 2020 value
+    np.testing.assert_allclose(annual_reduction(annual, 2020, 2030), [0.04, 0.03, np.nan, 0.1, np.nan],
+                               equal_nan=True)
+
+    rows = df.iloc[[3, 1]]
+    frame = annual_frame(rows, annual, 2028, 2031)
+    assert frame.index.tolist() == [3, 1] and frame.columns.tolist() == [2028, 2029, 2030, 2031]
+    np.testing.assert_allclose(frame.to_numpy(), [[2.0, 1.0, 0.0, 0.0], [38.0, 36.5, 35.0, 33.5]])
+
+
+def test_load_annual_caches_one_series_per_version_and_method(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / ".snapshots"))
+    monkeypatch.setitem(dataset_registry.DATASET_SCHEMAS, ("annual.xlsx", None), ("Scenario",))
+    data_loader.sheet_digests.clear()
+    wb = openpyxl.Workbook()
+    wb.active.append(["Scenario"] + YEARS.tolist())
+    for i, row in enumerate(ROWS):
+        wb.active.append([f"S{i}"] + [None if np.isnan(value) else value for value in row])
+    wb.save(tmp_path / "annual.xlsx")
+
+    linear = dataset_registry.load_annual("annual.xlsx", None, None)
+    assert dataset_registry.load_annual("annual.xlsx", None, None) is linear
+    log_linear = dataset_registry.load_annual("annual.xlsx", None, None, method="log-linear")
+    assert log_linear is not linear and log_linear["method"] == "log-linear"
+    np.testing.assert_allclose(linear["values"], interpolate_annual(ROWS.T, YEARS)[1], equal_nan=True)
+    assert dataset_registry.load_annual("Metrics.xlsx", None, None) is None
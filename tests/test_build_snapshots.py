@@ -0,0 +1,69 @@
+import openpyxl
+import pandas as pd
+import pytest
+import data_loader
+from build_snapshots import build_all, check_sheet, print_table
+from data_loader import sheet_extent
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    directory = tmp_path / ".snapshots"
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(directory))
+    data_loader.sheet_digests.clear()
+    return directory
+
+
+# Function to write a workbook whose data sheet has two title rows above its header, a row wider
+# than the header, a blank row between data rows, trailing blank and styled empty rows, and an
+# empty sheet
+def write_workbook(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["Pathways"])
+    ws.append([])
+    ws.append(["Scenario", "Unit", 2030, 2040])
+    for i in range(30):
+        ws.append([f"Scenario {i}", "Mt", i, i / 2])
+    ws.append([])
+    ws.append(["Late", "Mt", 1, 2, "note"])
+    ws.cell(row=40, column=8).number_format = "0.0"
+    wb.create_sheet("Empty")
+    wb.save(path)
+
+
+def test_sheet_extent_counts_rows_and_columns_like_pandas(tmp_path):
+    write_workbook(tmp_path / "pathways.xlsx")
+    path = str(tmp_path / "pathways.xlsx")
+    assert sheet_extent(path, "Data", 2) == (32, 5) == pd.read_excel(path, "Data", skiprows=2).shape
+    assert sheet_extent(path, "Data") == (34, 5)
+    assert sheet_extent(path, "Empty") == (0, 0)
+    assert sheet_extent(path, "Data", 40) == (0, 0)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_build_reports_rows_and_checks_out(tmp_path, snapshot_dir, monkeypatch, capsys, stream):
+    write_workbook(tmp_path / "pathways.xlsx")
+    path = str(tmp_path / "pathways.xlsx")
+    if stream:
+        monkeypatch.setattr(data_loader, "STREAM_MIN_BYTES", 0)
+    results = build_all([(path, "Data", 2, None), (path, "Data", 2, ("Scenario",))], workers=1)
+    assert sorted(results[path]) == ["Data (skip 2)", "Data (skip 2) (1 columns)"]
+    full = results[path]["Data (skip 2)"]
+    assert (full["rows"], full["columns"], full["expected"]) == (32, 5, (32, 5))
+    assert results[path]["Data (skip 2) (1 columns)"]["columns"] == 3
+    assert all(check_sheet(label, result) is None for label, result in results[path].items())
+    assert len(list(snapshot_dir.glob("Data__*.parquet"))) == 2
+    print_table(results)
+    line = capsys.readouterr().out.splitlines()[1].split()
+    assert line[-4:] == ["2", "64", line[-2], "ok"]
+
+
+def test_build_reports_a_mismatch_and_a_failure(tmp_path, snapshot_dir):
+    write_workbook(tmp_path / "pathways.xlsx")
+    path = str(tmp_path / "pathways.xlsx")
+    results = build_all([(path, "Missing", None, None)], workers=1)
+    assert check_sheet("Missing", results[path]["Missing"]).startswith("Missing: failed")
+    mismatch = {"rows": 31, "columns": 5, "expected": (32, 5), "seconds": 0.1}
+    assert check_sheet("Data", mismatch) == "Data: 31x5 written, 32x5 in source"
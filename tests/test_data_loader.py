@@ -0,0 +1,199 @@
+import itertools
+import os
+import re
+import zipfile
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import data_loader
+from data_loader import sheet_digest
+
+
+# Function to rewrite empty cells the way Excel saves them, as self-closing <c .../> tags
+def excel_empty_cells(path):
+    with zipfile.ZipFile(path) as zf:
+        parts = {info: zf.read(info) for info in zf.infolist()}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for info, data in parts.items():
+            if info.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb"(<c\b[^>]*)></c>", rb"\1/>", data)
+            zf.writestr(info, data)
+
+
+# Function to write a workbook with a data sheet (a header and rows of years) and a second sheet
+def write_workbook(path, rows=500, edit=None, number_format=None):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["Scenario", "Metric", "Unit", 2020, 2030])
+    for i in range(rows):
+        ws.append([f"Scenario {i % 7}", "Emissions", "Mt", i * 1.5, None if i % 11 == 0 else i * 0.5])
+    # A styled empty cell, saved as a self-closing <c .../> near the top of the sheet data
+    ws.cell(row=2, column=6).number_format = "0.0"
+    other = wb.create_sheet("Notes")
+    other.append(["Note", 1.25])
+    if edit is not None:
+        ws.cell(row=edit[0], column=edit[1], value=edit[2])
+    if number_format is not None:
+        other.cell(row=1, column=2).number_format = number_format
+    wb.save(path)
+    excel_empty_cells(path)
+
+
+@pytest.fixture(autouse=True)
+def fresh_digests():
+    data_loader.sheet_digests.clear()
+    yield
+    data_loader.sheet_digests.clear()
+
+
+@pytest.mark.parametrize("row, column", [(2, 4), (250, 5), (500, 4), (501, 1)])
+def test_digest_changes_on_edit_anywhere_in_sheet(tmp_path, row, column):
+    write_workbook(tmp_path / "before.xlsx")
+    write_workbook(tmp_path / "after.xlsx", edit=(row, column, 999999))
+    assert sheet_digest(str(tmp_path / "before.xlsx"), "Data") != sheet_digest(str(tmp_path / "after.xlsx"), "Data")
+
+
+def test_digest_ignores_other_sheets(tmp_path):
+    write_workbook(tmp_path / "before.xlsx")
+    write_workbook(tmp_path / "after.xlsx", number_format="0.000%")
+    before, after = str(tmp_path / "before.xlsx"), str(tmp_path / "after.xlsx")
+    assert sheet_digest(before, "Data") == sheet_digest(after, "Data")
+    assert sheet_digest(before, "Notes") != sheet_digest(after, "Notes")
+
+
+def test_digest_is_stable_across_saves(tmp_path):
+    write_workbook(tmp_path / "first.xlsx")
+    write_workbook(tmp_path / "second.xlsx")
+    assert sheet_digest(str(tmp_path / "first.xlsx"), "Data") == sheet_digest(str(tmp_path / "second.xlsx"), "Data")
+
+
+def test_read_csv_typed(tmp_path, caplog):
+    path = tmp_path / "pathways.csv"
+    path.write_text("Scenario,Unit,2020,2030\nNZ,Mt,1.5,\nCP,Mt,2,3.25\n")
+    df = data_loader.read_csv(str(path))
+    assert list(df.columns) == ["Scenario", "Unit", 2020, 2030]
+    assert df[2030].isna().tolist() == [True, False]
+    assert "pandas" not in caplog.text
+
+
+def test_read_csv_falls_back_to_pandas_and_logs_it(tmp_path, caplog):
+    path = tmp_path / "pathways.csv"
+    path.write_text("Scenario,Unit,2020,2030\nNZ,Mt,1.5,##########\nCP,Mt,2,3.25\n")
+    df = data_loader.read_csv(str(path))
+    assert list(df.columns) == ["Scenario", "Unit", 2020, 2030]
+    assert df[2020].tolist() == [1.5, 2.0]
+    assert "with pandas" in caplog.text
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    directory = tmp_path / ".snapshots"
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(directory))
+    return directory
+
+
+# Function to fail a test that parses a source the snapshots should have served
+def no_parse(*args, **kwargs):
+    raise AssertionError("the source was parsed again")
+
+
+def test_snapshot_serves_the_next_load(tmp_path, snapshot_dir, monkeypatch):
+    write_workbook(tmp_path / "pathways.xlsx")
+    path = str(tmp_path / "pathways.xlsx")
+    parsed = data_loader.read_dataset(path, "Data")
+    assert len(list(snapshot_dir.glob("Data__*.parquet"))) == 1
+    monkeypatch.setattr(data_loader, "read_source", no_parse)
+    pd.testing.assert_frame_equal(data_loader.read_dataset(path, "Data"), parsed)
+    # Sheet None is the first sheet, and shares its snapshot
+    pd.testing.assert_frame_equal(data_loader.read_dataset(path), parsed)
+
+
+def test_snapshot_is_replaced_after_an_edit(tmp_path, snapshot_dir):
+    path = str(tmp_path / "pathways.xlsx")
+    write_workbook(path)
+    before = data_loader.read_dataset(path, "Data")
+    write_workbook(path, edit=(500, 4, 999999))
+    after = data_loader.read_dataset(path, "Data")
+    assert before.iloc[498, 3] != 999999 and after.iloc[498, 3] == 999999
+    assert len(list(snapshot_dir.glob("Data__*.parquet"))) == 2
+
+
+def test_streamed_snapshot_matches_the_parse(tmp_path, snapshot_dir, monkeypatch):
+    path = str(tmp_path / "pathways.xlsx")
+    write_workbook(path)
+    parsed = data_loader.read_dataset(path, "Data")
+    for snapshot in snapshot_dir.glob("*.parquet"):
+        snapshot.unlink()
+    monkeypatch.setattr(data_loader, "STREAM_MIN_BYTES", 0)
+    monkeypatch.setattr(data_loader, "read_source", no_parse)
+    streamed = data_loader.read_dataset(path, "Data")
+    pd.testing.assert_frame_equal(streamed, parsed, check_dtype=False)
+
+
+def test_eviction_keeps_the_most_recent_snapshots(snapshot_dir):
+    snapshot_dir.mkdir()
+    for i, name in enumerate(["oldest", "older", "newer", "newest"]):
+        path = snapshot_dir / f"{name}.parquet"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    data_loader.evict_snapshots(max_bytes=250)
+    assert sorted(path.stem for path in snapshot_dir.iterdir()) == ["newer", "newest"]
+    # The most recent snapshot is kept even when it alone is over the bound
+    data_loader.evict_snapshots(max_bytes=50)
+    assert [path.stem for path in snapshot_dir.iterdir()] == ["newest"]
+
+
+def test_snapshot_sheets_without_a_writable_store(tmp_path, monkeypatch):
+    write_workbook(tmp_path / "pathways.xlsx")
+    # A file where the store's directory should be: no snapshot can be written
+    (tmp_path / "blocked").write_text("")
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / "blocked"))
+    path = str(tmp_path / "pathways.xlsx")
+    assert data_loader.snapshot_sheets(path, {"Data": None, "Notes": None}) == {}
+    assert len(data_loader.read_dataset(path, "Data")) == 500
+
+
+def test_missing_source_resolves_to_identical_copies_only(tmp_path):
+    write_workbook(tmp_path / "pathways2.xlsx")
+    (tmp_path / "pathways - Copy.xlsx").write_bytes((tmp_path / "pathways2.xlsx").read_bytes())
+    (tmp_path / "~$pathways.xlsx").write_bytes(b"lock")
+    (tmp_path / "pathways_old.xlsx").write_bytes(b"other")
+    missing = str(tmp_path / "pathways.xlsx")
+    assert data_loader.source_copies(missing) == [os.path.relpath(tmp_path / "pathways - Copy.xlsx"),
+                                                  os.path.relpath(tmp_path / "pathways2.xlsx")]
+    assert data_loader.resolve_source(missing) == os.path.relpath(tmp_path / "pathways - Copy.xlsx")
+    # Copies that differ leave the path unresolved
+    write_workbook(tmp_path / "pathways3.xlsx", edit=(2, 4, 999999))
+    assert data_loader.resolve_source(missing) == missing
+
+
+def test_streamed_csv_with_text_in_a_year_column(tmp_path, snapshot_dir, monkeypatch, caplog):
+    path = tmp_path / "pathways.csv"
+    path.write_text("Scenario,Unit,2020,2030\n" + "NZ,Mt,1.5,2\n" * 50 + "CP,Mt,2,##########\n")
+    monkeypatch.setattr(data_loader, "STREAM_MIN_BYTES", 0)
+    # Small blocks, so the text turns up after the first batch has been written
+    monkeypatch.setattr(data_loader, "CSV_BLOCK_BYTES", 64)
+    df = data_loader.read_dataset(str(path))
+    assert list(df.columns) == ["Scenario", "Unit", 2020, 2030]
+    assert len(df) == 51 and df[2030].iloc[:50].eq(2).all() and np.isnan(df[2030].iloc[50])
+    assert "text year columns" in caplog.text
+    assert not list(snapshot_dir.glob("*.tmp"))
+
+
+def test_failed_stream_leaves_no_temporary_file(tmp_path, snapshot_dir, monkeypatch):
+    write_workbook(tmp_path / "pathways.xlsx")
+    monkeypatch.setattr(data_loader, "STREAM_MIN_BYTES", 0)
+    monkeypatch.setattr(data_loader, "INGEST_MAX_BYTES", 64 * 5 * 100)
+
+    # Function to fail partway through the sheet, once a row group has been written
+    def failing_chunks(*args, **kwargs):
+        yield from itertools.islice(real_chunks(*args, **kwargs), 1)
+        raise OSError("disk full")
+
+    real_chunks = data_loader.xlsx_chunks
+    monkeypatch.setattr(data_loader, "xlsx_chunks", failing_chunks)
+    with pytest.raises(OSError):
+        data_loader.read_dataset(str(tmp_path / "pathways.xlsx"), "Data")
+    assert not list(snapshot_dir.iterdir())
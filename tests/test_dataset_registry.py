@@ -0,0 +1,201 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import data_loader
+from dataset_registry import (apply_schema, build_index, facet_options, filter_frame, load_full_data, load_sheets,
+                              normalise_key, normalise_keys, select_rows, year_axis, year_range)
+
+DIMENSIONS = ["Scenario", "Region", "Unit"]
+
+
+# Function to draw a dataset with categorical and text dimensions whose values differ only in case
+# and surrounding spaces, missing labels and a year column
+def sample_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    scenarios = rng.choice(["NZ 2050", "nz 2050 ", "Current Policies", "Delayed", None], size=rows)
+    regions = rng.choice(["World", " world", "Europe", "Asia", "Median of regions", None], size=rows)
+    return pd.DataFrame({
+        "Scenario": pd.Categorical(scenarios),
+        "Region": regions,
+        "Unit": rng.choice(["Mt", "Gt"], size=rows),
+        2030: rng.normal(size=rows),
+    })
+
+
+# Function to filter a frame row by row: every selected column's normalised key is one selected
+def brute_force(df, selections):
+    keep = np.ones(len(df), dtype=bool)
+    for col, values in selections.items():
+        if values:
+            wanted = {normalise_key(v) for v in values}
+            keep &= np.array([normalise_key(value) in wanted for value in df[col].astype(str)])
+    return np.flatnonzero(keep)
+
+
+# Function to draw random selections, mixing spellings, missing labels and absent values
+def random_selections(seed):
+    rng = np.random.default_rng(seed)
+    options = {"Scenario": ["NZ 2050", "CURRENT POLICIES", "Delayed", "nan", "Unknown"],
+               "Region": ["WORLD", "europe ", "Asia", "nan", "Mars"],
+               "Unit": ["Mt", "gt"]}
+    return {col: list(rng.choice(values, size=rng.integers(1, 3), replace=False))
+            for col, values in options.items() if rng.random() < 0.7}
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_select_rows_matches_brute_force(seed):
+    df = sample_frame()
+    index = build_index(df, DIMENSIONS)
+    selections = random_selections(seed)
+    np.testing.assert_array_equal(select_rows(index, selections), brute_force(df, selections))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_select_rows_within_candidate_rows(seed):
+    df = sample_frame()
+    index = build_index(df, DIMENSIONS)
+    selections = random_selections(seed)
+    rows = np.flatnonzero(df[2030].to_numpy() > 0).astype(np.int32)
+    expected = np.intersect1d(rows, brute_force(df, selections))
+    np.testing.assert_array_equal(select_rows(index, selections, rows), expected)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_filter_frame_matches_brute_force(seed):
+    df = sample_frame()
+    index = build_index(df, DIMENSIONS)
+    selections = random_selections(seed)
+    pd.testing.assert_frame_equal(filter_frame(df, index, selections), df.iloc[brute_force(df, selections)])
+    # A row subset of the dataset, as the pages pass after their year filter
+    subset = df[df[2030] > 0]
+    expected = subset.iloc[brute_force(subset, selections)]
+    pd.testing.assert_frame_equal(filter_frame(subset, index, selections), expected)
+    pd.testing.assert_frame_equal(filter_frame(df, None, selections), df.iloc[brute_force(df, selections)])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_facet_counts_match_brute_force(seed):
+    df = sample_frame()
+    index = build_index(df, DIMENSIONS)
+    selections = {col: [] for col in DIMENSIONS} | random_selections(seed)
+    facets = facet_options(index, selections)
+    for col, options in facets.items():
+        others = {other: values for other, values in selections.items() if other != col}
+        for value, count in options.items():
+            assert count == len(brute_force(df, others | {col: [value]})), (col, value)
+        reachable = {normalise_key(value) for value in df[col].astype(str).iloc[brute_force(df, others)]}
+        assert {normalise_key(value) for value in options} >= reachable
+
+
+def test_normalise_keys_matches_normalise_key():
+    labels = ["NZ 2050", " nz 2050 ", "ÉNERGIE", "Straße", "nan", "", "\tWorld\n"]
+    assert list(normalise_keys(labels)) == [normalise_key(label) for label in labels]
+
+
+def test_flags_match_brute_force():
+    df = sample_frame()
+    index = build_index(df, DIMENSIONS, flags={"is_world": ("Region", "world"), "is_missing": ("Unit", "kt")})
+    regions = df["Region"].astype(str)
+    np.testing.assert_array_equal(index["flags"]["is_median"], regions.str.contains("Median").to_numpy())
+    np.testing.assert_array_equal(index["flags"]["is_world"], regions.str.casefold().str.contains("world").to_numpy())
+    assert not index["flags"]["is_missing"].any()
+
+
+def test_apply_schema_keeps_values_and_orders_years():
+    df = pd.DataFrame({"Scenario": ["NZ", "CP", "NZ"], "Note": ["a", "b", None],
+                       "2040": [0.1, 1e-12, 123456789.123456789], "2030": [1, "##########", 3]})
+    schema = apply_schema(df, ["Scenario"])
+    assert list(schema.columns) == ["Scenario", "Note", 2030, 2040]
+    assert isinstance(schema["Scenario"].dtype, pd.CategoricalDtype)
+    assert schema["Note"].dtype == object
+    assert schema[2040].dtype == np.float64 and schema[2040].tolist() == [0.1, 1e-12, 123456789.123456789]
+    assert schema[2030].tolist()[0] == 1.0 and np.isnan(schema[2030].tolist()[1])
+
+
+
+@pytest.mark.parametrize("dimensions", [None, ["Scenario"]])
+def test_shared_frames_are_read_only(dimensions):
+    df = apply_schema(pd.DataFrame({"Scenario": ["NZ", "CP"], "Note": ["a", "b"], "2030": [1.0, 2.0]}), dimensions)
+    year = df.columns[-1]
+    with pytest.raises(ValueError, match="read-only"):
+        df.iloc[0, 1] = "x"
+    with pytest.raises(ValueError, match="read-only"):
+        df[year].to_numpy()[0] = -1.0
+    # Dimension columns too, categorical or not, through a shallow copy as well as the frame itself
+    shallow = df.copy(deep=False)
+    with pytest.raises(ValueError, match="read-only"):
+        shallow.iloc[0, 0] = "CP"
+    with pytest.raises(ValueError, match="read-only"):
+        df.loc[0, "Scenario"] = "CP"
+    with pd.option_context("mode.copy_on_write", True):
+        view = df[df[year] > 0]
+        view.iloc[0, -1] = -1.0
+        view.iloc[0, 0] = "CP"
+    assert df["Scenario"].tolist() == ["NZ", "CP"]
+    assert df["Note"].tolist() == ["a", "b"] and df[year].tolist() == [1.0, 2.0]
+
+
+def test_load_sheets_without_a_writable_store(tmp_path, monkeypatch):
+    wb = openpyxl.Workbook()
+    wb.active.title = "criteria"
+    wb.active.append(["Criterion", "Value"])
+    wb.active.append(["Warming", 1.5])
+    wb.create_sheet("Residuals").append(["Sector", 2050])
+    wb.save(tmp_path / "Phase-Out.xlsx")
+    (tmp_path / "blocked").write_text("")
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / "blocked"))
+    sheets = load_sheets(str(tmp_path / "Phase-Out.xlsx"), {"criteria": None, "Residuals": None})
+    assert sheets["criteria"]["Criterion"].tolist() == ["Warming"]
+    assert list(sheets["Residuals"].columns) == ["Sector", 2050]
+
+
+def test_identical_sources_share_one_snapshot_and_frame(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / ".snapshots"))
+    wb = openpyxl.Workbook()
+    wb.active.append(["Scenario", "Unit", 2030, 2040])
+    wb.active.append(["NZ", "Mt", 1.0, 0.5])
+    wb.save(tmp_path / "Pathways2.xlsx")
+    (tmp_path / "Pathways (1).xlsx").write_bytes((tmp_path / "Pathways2.xlsx").read_bytes())
+    # An editor lock file next to them is not a source
+    (tmp_path / "~$Pathways.xlsx").write_bytes(b"lock")
+    # Pathways.xlsx itself is missing and served by its identical copies
+    frames = [load_full_data(path, None, None) for path in ("Pathways2.xlsx", "Pathways (1).xlsx", "Pathways.xlsx")]
+    assert len(list((tmp_path / ".snapshots").glob("*.parquet"))) == 1
+    for df in frames[1:]:
+        assert np.shares_memory(df[2030].to_numpy(), frames[0][2030].to_numpy())
+
+
+def test_year_axis_keeps_only_numeric_year_headers():
+    columns = ["Model", 2050, "2030", "Unnamed: 3", "2040.0", np.int64(2040), "x2035", " 2045", 2020.5]
+    axis = year_axis(columns)
+    assert axis["years"].tolist() == [2030, 2040, 2050]
+    assert axis["positions"].tolist() == [2, 5, 1]
+    # Labels keep the type the frame uses, so they select its columns
+    assert axis["labels"] == ["2030", 2040, 2050]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (None, None, [2020, 2025, 2030, 2040]),
+    (2025, 2030, [2025, 2030]),
+    ("2025", "2030", [2025, 2030]),
+    (2021, 2039, [2025, 2030]),
+    # Bounds outside the axis are clamped to it
+    (1900, 2200, [2020, 2025, 2030, 2040]),
+    (None, 2019, []),
+    (2041, None, []),
+    # Reversed bounds select nothing, as a start after the end does
+    (2040, 2020, []),
+    (2030, 2030, [2030]),
+])
+def test_year_range_slices_the_axis(start, end, expected):
+    axis = year_axis(["Scenario", 2040, 2020, 2030, 2025])
+    assert year_range(axis, start, end) == expected
+    # The same as testing every column
+    assert expected == [year for year in (2020, 2025, 2030, 2040)
+                        if (start is None or year >= int(start)) and (end is None or year <= int(end))]
+
+
+def test_year_range_of_a_frame_without_years():
+    assert year_range(year_axis(["Scenario", "Unit"]), 2020, 2050) == []
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+import app
+from page_registry import load_page, page_module, render_page
+from sectors import SECTORS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.mark.parametrize("page", list(app.pages))
+def test_every_registered_page_resolves(repo_root, page):
+    module_name = app.pages[page]["file"]
+    if module_name in SECTORS:
+        # Sector pages are drawn from their spec by render_sector
+        assert {"dataset_name", "file_path", "filter_columns", "chart"} <= set(SECTORS[module_name])
+    else:
+        assert callable(load_page(module_name).render)
+
+
+def test_unknown_page_fails_cleanly(repo_root):
+    with pytest.raises(ModuleNotFoundError, match="No page named 'no_such_page'"):
+        render_page("no_such_page")
+    assert "no_such_page" not in sys.modules
+
+
+def test_page_is_reimported_when_its_file_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    page = tmp_path / "sample_page.py"
+    page.write_text("def render():\n    return 'first'\n")
+    try:
+        assert load_page("sample_page").render() == "first"
+        assert load_page("sample_page") is load_page("sample_page")
+        page.write_text("def render():\n    return 'second'\n")
+        os.utime(page, (os.path.getmtime(page) + 10,) * 2)
+        assert load_page("sample_page").render() == "second"
+    finally:
+        page_module.clear()
+        sys.modules.pop("sample_page", None)
@@ -0,0 +1,152 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import data_loader
+import pathway_db
+from dataset_registry import build_index, facet_options, filter_frame
+
+COLUMNS = ["Scenario", "Metric", "Unit"]
+
+ROWS = [
+    ["NZ 2050", "Emissions", "Mt", 10.0, 5.0, 0.0],
+    ["nz 2050 ", "Intensity", "t/t", 1.0, None, 0.5],
+    ["Current Policies", "Emissions", "Mt", 12.0, 11.0, 10.0],
+    # A series without any numeric value
+    ["Current Policies", "Capacity", "GW", None, None, None],
+    ["Delayed", "Emissions", "Mt", None, 9.0, "##########"],
+    ["Median", "Emissions", "Mt", 11.0, 9.0, 5.0],
+]
+
+FLAGS = {"is_nz": ("Scenario", "nz")}
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["Scenario", "Metric", "Unit", 2030, 2040, 2050])
+    for row in ROWS:
+        ws.append(row)
+    wb.save(tmp_path / "pathways.xlsx")
+    monkeypatch.setattr(data_loader, "SNAPSHOT_DIR", str(tmp_path / ".snapshots"))
+    monkeypatch.setattr(pathway_db, "DATASETS", {"test": {"file_path": "pathways.xlsx", "sheet": "Data"}})
+    monkeypatch.setitem(pathway_db.DATASET_FLAGS, ("pathways.xlsx", "Data"), FLAGS)
+    monkeypatch.setattr(pathway_db, "DB_PATH", str(tmp_path / ".snapshots" / "pathways.duckdb"))
+    data_loader.sheet_digests.clear()
+    pathway_db.database_connection.clear()
+    yield pathway_db.DB_PATH
+    pathway_db.database_connection.clear()
+
+
+# Function to filter the dataset in memory the way the other pages do, shaped like a query result
+def in_memory(filters=None, start_year=None, end_year=None):
+    df = data_loader.read_dataset("pathways.xlsx", "Data")
+    df = filter_frame(df, build_index(df, COLUMNS), filters or {})
+    years = [year for year in (2030, 2040, 2050)
+             if (start_year is None or year >= start_year) and (end_year is None or year <= end_year)]
+    values = df[years].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    return pd.concat([df[COLUMNS], values], axis=1).reset_index(drop=True)
+
+
+def test_series_without_values_are_ingested(database):
+    assert pathway_db.build_database(database) == ["test"]
+    rows = pathway_db.query_pathways("test")
+    assert len(rows) == len(ROWS)
+    assert pathway_db.distinct_values("test", "Metric") == ["Emissions", "Intensity", "Capacity"]
+
+
+@pytest.mark.parametrize("filters, start_year, end_year", [
+    ({}, None, None),
+    ({"Scenario": ["NZ 2050"]}, None, None),
+    ({"Scenario": ["CURRENT POLICIES"], "Metric": ["capacity "]}, None, None),
+    ({"Metric": ["Emissions"], "Unit": ["mt"]}, 2040, None),
+    ({"Scenario": ["Delayed", "nz 2050"]}, 2030, 2040),
+])
+def test_queries_match_in_memory_filtering(database, filters, start_year, end_year):
+    result = pathway_db.query_pathways("test", filters, start_year, end_year).reset_index(drop=True)
+    expected = in_memory(filters, start_year, end_year)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_column_type=False, check_names=False)
+
+
+def test_unchanged_datasets_are_not_ingested_again(database):
+    pathway_db.build_database(database)
+    assert pathway_db.build_database(database) == []
+    assert pathway_db.database_is_fresh(database)
+
+
+def test_queries_see_a_rebuild_in_the_same_process(database, tmp_path):
+    assert pathway_db.query_pathways("test", {"Scenario": ["Current Policies"], "Metric": ["Emissions"]})[2030].iloc[0] == 12.0
+    wb = openpyxl.load_workbook(tmp_path / "pathways.xlsx")
+    wb["Data"]["D4"] = 42.0
+    wb.save(tmp_path / "pathways.xlsx")
+    assert not pathway_db.database_is_fresh(database)
+    assert pathway_db.query_pathways("test", {"Scenario": ["Current Policies"], "Metric": ["Emissions"]})[2030].iloc[0] == 42.0
+    assert pathway_db.database_is_fresh(database)
+    # Only the current build is left in the store
+    assert [path.name for path in (tmp_path / ".snapshots").glob("pathways*.duckdb*")] == [
+        pathway_db.read_manifest(database)["database"]]
+
+
+@pytest.mark.parametrize("selections", [
+    {"Scenario": [], "Metric": [], "Unit": []},
+    {"Scenario": ["nz 2050"], "Metric": [], "Unit": []},
+    {"Scenario": [], "Metric": ["Emissions"], "Unit": ["GW"]},
+])
+@pytest.mark.parametrize("row_filter", [None, {"flag": "is_nz"}, {"flag": "is_nz", "exclude": True}])
+def test_facet_counts_match_the_in_memory_index(database, selections, row_filter):
+    df = data_loader.read_dataset("pathways.xlsx", "Data")
+    index = build_index(df, COLUMNS, FLAGS)
+    rows = None
+    if row_filter:
+        hits = index["flags"][row_filter["flag"]]
+        rows = np.flatnonzero(~hits if row_filter.get("exclude") else hits)
+    expected = facet_options(index, selections, rows)
+    result = pathway_db.facet_counts("test", selections, row_filter)
+    assert {col: list(counts.items()) for col, counts in result.items()} == {
+        col: list(counts.items()) for col, counts in expected.items()}
+
+
+def test_flags_match_the_in_memory_index(database):
+    index = build_index(data_loader.read_dataset("pathways.xlsx", "Data"), COLUMNS, FLAGS)
+    for flag in ("is_median", "is_nz"):
+        np.testing.assert_array_equal(pathway_db.dataset_flags("test", flag), index["flags"][flag])
+
+
+def test_rows_are_labelled_by_their_position_in_the_dataset(database):
+    result = pathway_db.query_pathways("test", {"Metric": ["Emissions"]}, row_filter={"flag": "is_nz", "exclude": True})
+    assert result.index.tolist() == [2, 4, 5]
+    assert result.columns.tolist() == COLUMNS + [2030, 2040, 2050]
+
+
+def test_missing_sources_are_left_out(database, tmp_path, monkeypatch):
+    monkeypatch.setitem(pathway_db.DATASETS, "missing", {"file_path": "missing.xlsx", "sheet": None})
+    assert pathway_db.dataset_years("test") == [2030, 2040, 2050]
+    with pytest.raises(FileNotFoundError, match="missing.xlsx"):
+        pathway_db.dataset_years("missing")
+
+
+# Page drawing the database filter widgets of the test dataset (run by AppTest)
+def filter_page():
+    import streamlit as st
+    from sectors import database_filter_widgets
+
+    st.session_state["selected"] = database_filter_widgets("test", ["Scenario", "Metric", "Unit"], key_format="{col}_test")
+
+
+def test_filter_widgets_narrow_to_the_other_selections(database):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_function(filter_page).run()
+    assert at.multiselect(key="Metric_test").options == ["Emissions (4)", "Intensity (1)", "Capacity (1)"]
+    # Spellings that differ only in case and spacing are one option, shown in its first spelling
+    assert at.multiselect(key="Scenario_test").options == ["NZ 2050 (2)", "Current Policies (2)", "Delayed (1)",
+                                                             "Median (1)"]
+    at = at.multiselect(key="Scenario_test").select("NZ 2050").run()
+    assert at.multiselect(key="Metric_test").options == ["Emissions (1)", "Intensity (1)"]
+    assert at.multiselect(key="Unit_test").options == ["Mt (1)", "t/t (1)"]
+    at = at.multiselect(key="Metric_test").select("Intensity").run()
+    assert at.multiselect(key="Scenario_test").options == ["NZ 2050 (1)"]
+    assert at.session_state["selected"] == {"Scenario": ["NZ 2050"], "Metric": ["Intensity"], "Unit": []}
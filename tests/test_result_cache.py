@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from dataset_registry import freeze_frame
+from result_cache import cached_result, query_key, result_bytes, result_stats, result_store
+
+
+# Function to build a result holding a frame of n rows
+def make_result(n):
+    return {"frame": pd.DataFrame({"value": range(n)}, dtype="int64"), "excel": b"x" * 100, "elements": []}
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    result_store.clear()
+    yield
+    result_store.clear()
+
+
+def test_query_key_is_normalised():
+    assert (query_key("v1", "steel", {"Scenario": [" 1.5C ", "Below 2"], "Unit": []}, 2020, 2050)
+            == query_key("v1", "steel", {"Scenario": ["below 2", "1.5c", "1.5C"]}, 2020, 2050))
+    assert query_key("v1", "steel", {}, 2020, 2050) != query_key("v2", "steel", {}, 2020, 2050)
+    assert query_key("v1", "steel", {}, 2020, 2050) != query_key("v1", "cement", {}, 2020, 2050)
+
+
+def test_hit_returns_stored_result():
+    first = cached_result("a", lambda: make_result(10))
+    second = cached_result("a", lambda: pytest.fail("a hit must not rebuild"))
+    assert second is first
+    stats = result_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_eviction_respects_byte_bound():
+    size = result_bytes(make_result(1000))
+    max_bytes = 3 * size + size // 2
+    for key in range(5):
+        cached_result(key, lambda: make_result(1000), max_bytes=max_bytes)
+        assert result_store()["bytes"] <= max_bytes
+    assert list(result_store()["entries"]) == [2, 3, 4]
+    assert result_stats()["evictions"] == 2
+
+
+def test_eviction_is_least_recently_used():
+    size = result_bytes(make_result(1000))
+    max_bytes = 3 * size
+    for key in range(3):
+        cached_result(key, lambda: make_result(1000), max_bytes=max_bytes)
+    cached_result(0, lambda: make_result(1000), max_bytes=max_bytes)
+    cached_result(3, lambda: make_result(1000), max_bytes=max_bytes)
+    assert list(result_store()["entries"]) == [2, 0, 3]
+
+
+def test_result_over_bound_is_not_stored():
+    result = cached_result("big", lambda: make_result(10000), max_bytes=1000)
+    assert len(result["frame"]) == 10000
+    assert "big" not in result_store()["entries"]
+    assert result_store()["bytes"] == 0
+
+
+def test_size_of_a_frozen_frame_with_text_columns():
+    frame = pd.DataFrame({"Scenario": ["NZ 2050", None], "Unit": pd.Categorical(["Mt", "Mt"]), 2030: [1.0, 2.0]})
+    expected = int(frame.memory_usage(index=True, deep=True).sum()) + 100
+    assert result_bytes({"frame": freeze_frame(frame), "excel": b"x" * 100, "elements": []}) == expected
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+from sectors import SECTORS, filter_by_year, line_colors, line_figure, series_chart, trend_chart
+
+
+# Function to build a page's rows spanning two metric values and two units
+def mixed_rows(spec):
+    chart = spec["chart"]
+    return pd.DataFrame({chart["series"]: ["A", "B"], chart["metric"]: ["First", "Second"], "Unit": ["Mt", "Gt"],
+                         2030: [1.0, 2.0], 2035: [1.5, 2.5]})
+
+
+@pytest.mark.parametrize("page, title", [
+    ("steel", '"Multiple Metric" - Trend Comparison'),
+    ("pulp_paper", '"Multiple Metric" - Trend Comparison'),
+    ("cement", '"Multiple Metrics" - Trend Comparison'),
+    ("oil_gas", '"Multiple Metrics" - Trend Comparison'),
+])
+def test_trend_titles_of_several_metrics(page, title):
+    spec = SECTORS[page]
+    elements = trend_chart(mixed_rows(spec), None, spec, [2030, 2035])
+    assert elements[0][1].layout.title.text == title
+
+
+def test_series_title_of_several_metrics():
+    spec = SECTORS["commercial"]
+    elements = series_chart(mixed_rows(spec), None, spec, [2030, 2035])
+    assert elements[0][1].layout.title.text == "Multiple Building type"
+
+
+@pytest.mark.parametrize("page, title", [
+    ("FLAG", "Multiple Region"),
+    ("residential", "Multiple Building type"),
+])
+def test_single_metric_series_titles_of_mixed_units(page, title):
+    spec = SECTORS[page]
+    df = mixed_rows(spec).assign(**{spec["chart"]["metric"]: "First"})
+    elements = series_chart(df, None, spec, [2030, 2035])
+    assert elements[0][1].layout.title.text == title
+
+
+# Function to read a trace's points as (x, y) pairs, NaN gaps included
+def points(trace):
+    return [(x, None if np.isnan(y) else y)
+            for x, y in zip(np.asarray(trace.x, dtype=float), np.asarray(trace.y, dtype=float))]
+
+
+def test_line_figure_splits_rows_of_one_label_into_segments():
+    fig = line_figure(["NZ", "CP", "NZ"], [2030, 2040], [[1, 2], [3, 4], [5, 6]], "Scenario", "Mt")
+    assert [trace.name for trace in fig.data] == ["NZ", "CP"]
+    # Each row is its own segment, ended by a gap
+    x = np.asarray(fig.data[0].x, dtype=float)
+    assert len(x) == 6 and np.isnan(x[2]) and np.isnan(x[5])
+    assert points(fig.data[0])[:2] == [(2030, 1), (2040, 2)] and points(fig.data[0])[3:5] == [(2030, 5), (2040, 6)]
+    assert points(fig.data[1])[:2] == [(2030, 3), (2040, 4)]
+
+
+def test_line_figure_colours_labels_by_first_appearance_year_by_year():
+    # Once missing values are dropped, B has the first value in the earliest year, then A, then C
+    values = [[np.nan, 1, 2], [1, 2, 3], [np.nan, np.nan, 4]]
+    fig = line_figure(["A", "B", "C"], [2030, 2040, 2050], values, "Scenario", "Mt", drop_empty=True)
+    assert [trace.name for trace in fig.data] == ["B", "A", "C"]
+    # Kept missing values count as appearances, as the rows of a melted frame do in px.line
+    fig = line_figure(["A", "B", "C"], [2030, 2040, 2050], values, "Scenario", "Mt")
+    assert [trace.name for trace in fig.data] == ["A", "B", "C"]
+    colors = line_colors()
+    assert [trace.line.color for trace in fig.data] == [colors[0], colors[1], colors[2]]
+
+
+def test_line_figure_drop_empty_leaves_out_zero_and_missing_values():
+    values = [[0, 1, np.nan], [0, 0, np.nan]]
+    kept = line_figure(["A", "B"], [2030, 2040, 2050], values, "Scenario", "Mt", drop_empty=True)
+    assert [trace.name for trace in kept.data] == ["A"]
+    assert [x for x, y in points(kept.data[0]) if y is not None] == [2040]
+    shown = line_figure(["A", "B"], [2030, 2040, 2050], values, "Scenario", "Mt")
+    assert [trace.name for trace in shown.data] == ["A", "B"]
+    assert points(shown.data[0])[:3] == [(2030, 0), (2040, 1), (2050, None)]
+
+
+def test_line_figure_draws_extra_lines_after_the_rows():
+    fig = line_figure(["A"], [2030, 2040], [[np.nan, 1]], "Scenario", "Mt",
+                      extra_lines=[("SBTi Pathway", [0.5, 0.7])])
+    assert [trace.name for trace in fig.data] == ["A", "SBTi Pathway"]
+    assert points(fig.data[1])[:2] == [(2030, 0.5), (2040, 0.7)]
+
+
+def test_line_figure_without_years():
+    fig = line_figure(["A", "B"], [], np.empty((2, 0)), "Scenario", "Mt", drop_empty=True,
+                      extra_lines=[("SBTi Pathway", [])])
+    assert len(fig.data) == 0 and fig.layout.yaxis.title.text == "Mt"
+    assert len(line_figure([], [], np.empty((0, 0)), "Scenario", "Mt").data) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_line_figure_matches_px_line_order_and_colours(seed):
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(["NZ", "CP", "DP", "LED"], size=12)
+    values = rng.normal(size=(12, 4))
+    values[rng.random((12, 4)) < 0.4] = np.nan
+    years = [2030, 2040, 2050, 2060]
+    wide = pd.DataFrame(values, columns=years).assign(Scenario=labels)
+    melted = wide.melt(id_vars=["Scenario"], var_name="Year", value_name="Value")
+    expected = px.line(melted, x="Year", y="Value", color="Scenario", markers=True)
+    fig = line_figure(labels, years, values, "Scenario", "Value")
+    assert [(t.name, t.line.color) for t in fig.data] == [(t.name, t.line.color) for t in expected.data]
+    kept = melted.dropna()
+    expected = px.line(kept[kept["Value"] != 0], x="Year", y="Value", color="Scenario", markers=True)
+    fig = line_figure(labels, years, values, "Scenario", "Value", drop_empty=True)
+    assert [(t.name, t.line.color) for t in fig.data] == [(t.name, t.line.color) for t in expected.data]
+
+
+def test_filter_by_year_keeps_the_filter_columns_and_the_years_in_range():
+    df = pd.DataFrame({"Scenario": ["NZ"], "Unit": ["Mt"], 2050: [1.0], 2030: [2.0], "2040": [3.0]})
+    assert list(filter_by_year(df, ["Scenario"], 2035, None).columns) == ["Scenario", "2040", 2050]
+    assert list(filter_by_year(df, ["Scenario", "Unit"], 2060, 2000).columns) == ["Scenario", "Unit"]
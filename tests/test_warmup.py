@@ -0,0 +1,64 @@
+import logging
+import re
+import pytest
+import warmup
+
+DATASETS = {
+    "Steel": {"file_path": "Steel.xlsx"},
+    "Cement": {"file_path": "Cement.xlsx"},
+    "Missing": {"file_path": "Missing.xlsx"},
+}
+
+
+# Function to stand in for a dataset load: Cement fails to load, every other dataset loads
+def fake_warm_dataset(info):
+    return None if info["file_path"] == "Cement.xlsx" else info
+
+
+@pytest.fixture
+def records(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Steel.xlsx").touch()
+    (tmp_path / "Cement.xlsx").touch()
+    handler = logging.Handler()
+    handler.records = []
+    handler.emit = handler.records.append
+    warmup.logger.addHandler(handler)
+    monkeypatch.setattr(warmup, "PAGE_DATASETS", DATASETS)
+    monkeypatch.setattr(warmup, "warm_dataset", fake_warm_dataset)
+    monkeypatch.setattr(warmup, "database_cursor", lambda: "cursor")
+    yield handler.records
+    warmup.logger.removeHandler(handler)
+    warmup.warmup_done.clear()
+
+
+def test_warmup_records_every_task_and_sets_the_flag(records):
+    warmup.warmup_done.clear()
+    assert not warmup.warmup_ready()
+    warmup.run_warmup(max_workers=2)
+    assert warmup.warmup_done.is_set()
+    assert sorted(warmup.warmup_state["done"]) == ["Pathway database", "Steel"]
+    assert list(warmup.warmup_state["failed"]) == ["Cement"]
+    assert warmup.warmup_state["skipped"] == ["Missing"]
+    # A failed task leaves the caches cold
+    assert not warmup.warmup_ready()
+    messages = [(record.levelno, record.getMessage()) for record in records]
+    assert messages[0] == (logging.INFO, "Warm-up: Missing skipped, Missing.xlsx not found")
+    cement = re.compile(r"Warm-up \[[23]/4\] Cement: failed \(not loaded\)")
+    assert [level for level, message in messages if cement.fullmatch(message)] == [logging.WARNING]
+    assert re.fullmatch(r"Warm-up \[4/4\] Pathway database: \d+\.\d\ds", messages[-2][1])
+    assert messages[-1][0] == logging.INFO
+    assert re.fullmatch(r"Warm-up finished in \d+\.\d\ds \(1 failed\)", messages[-1][1])
+
+
+def test_warmup_is_ready_when_every_task_loads(records, monkeypatch):
+    monkeypatch.setattr(warmup, "warm_dataset", lambda info: info)
+    warmup.run_warmup(max_workers=2)
+    assert warmup.warmup_ready()
+    assert not warmup.warmup_state["failed"]
+
+
+def test_warmup_logs_to_the_server_log():
+    # Streamlit's logger has its own handler at info level, so progress shows under `streamlit run`
+    assert warmup.logger.isEnabledFor(logging.INFO)
+    assert warmup.logger.handlers
@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import streamlit as st
+from streamlit.logger import get_logger
+from data_loader import resolve_source
+from dataset_registry import PAGE_DATASETS, load_annual, load_cube, load_full_data, load_index, load_sheets, probe_schema
+from pathway_db import DATASETS, database_cursor
+
+# Progress of the warm-up, shared by every session of the server process, and the readiness flag
+# set once every task has finished
+warmup_state = {"total": len(PAGE_DATASETS) + 1, "done": {}, "failed": {}, "skipped": [], "started": None,
+                "finished": None}
+warmup_lock = threading.Lock()
+warmup_done = threading.Event()
+
+# Streamlit's logger writes to the server log under `streamlit run` (a plain module logger has no
+# handler there, so its info messages would be dropped)
+logger = get_logger(__name__)
+
+
+# Function to load one dataset, its index, its aggregate cube and its (linear) annual series into
+# the shared caches, as the page that shows it would. The pages of the datasets in the pathway
+# database query their rows from it, so only their cube and annual series are built
+def warm_dataset(info):
+    if "sheets" in info:
+        return load_sheets(info["file_path"], info["sheets"])
+    if any(dataset["file_path"] == info["file_path"] for dataset in DATASETS.values()):
+        cube = load_cube(info["file_path"], None, None, info.get("columns"))
+        annual = load_annual(info["file_path"], None, None, info.get("columns"))
+        return annual if cube is not None else None
+    if probe_schema(info["file_path"], columns=info.get("columns")) is None:
+        return None
+    df = load_full_data(info["file_path"], None, None, info.get("columns"))
+    load_index(info["file_path"], None, None, info.get("columns"))
+    load_cube(info["file_path"], None, None, info.get("columns"))
+    load_annual(info["file_path"], None, None, info.get("columns"))
+    return df
+
+
+# Function to run one warm-up task and time it
+def timed_task(task, *args):
+    start = time.perf_counter()
+    if task(*args) is None:
+        raise ValueError("not loaded")
+    return time.perf_counter() - start
+
+
+# Function to record and report the outcome of one warm-up task
+def record_task(name, future):
+    with warmup_lock:
+        try:
+            warmup_state["done"][name] = future.result()
+            outcome, level = f"{warmup_state['done'][name]:.2f}s", logging.INFO
+        except Exception as e:
+            warmup_state["failed"][name] = str(e)
+            outcome, level = f"failed ({e})", logging.WARNING
+        count = len(warmup_state["done"]) + len(warmup_state["failed"]) + len(warmup_state["skipped"])
+    logger.log(level, "Warm-up [%d/%d] %s: %s", count, warmup_state["total"], name, outcome)
+
+
+# Function to run a task in the warm-up thread itself, as a finished future
+def run_inline(task, *args):
+    future = Future()
+    try:
+        future.set_result(task(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# Function to warm every dataset in a thread pool, then the pathway database from their snapshots.
+# The readiness flag is set when every task has finished, even if some of them failed
+def run_warmup(max_workers=None):
+    warmup_done.clear()
+    warmup_state.update(total=len(PAGE_DATASETS) + 1, done={}, failed={}, skipped=[], started=time.perf_counter(),
+                        finished=None)
+    try:
+        datasets = {}
+        for name, info in PAGE_DATASETS.items():
+            if os.path.exists(resolve_source(info["file_path"])):
+                datasets[name] = info
+            else:
+                # Sources that are not deployed are left to the page's upload prompt
+                warmup_state["skipped"].append(name)
+                logger.info("Warm-up: %s skipped, %s not found", name, info["file_path"])
+        with ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1)) as pool:
+            futures = {pool.submit(timed_task, warm_dataset, info): name for name, info in datasets.items()}
+            for future in as_completed(futures):
+                record_task(futures[future], future)
+        # The database is ingested from the snapshots the dataset tasks wrote, so it is built last
+        record_task("Pathway database", run_inline(timed_task, database_cursor))
+    except RuntimeError as e:
+        # The pool refuses new tasks once the interpreter is shutting down
+        logger.warning("Warm-up stopped: %s", e)
+    finally:
+        warmup_state["finished"] = time.perf_counter()
+        warmup_done.set()
+    logger.info("Warm-up finished in %.2fs (%d failed)", warmup_state["finished"] - warmup_state["started"],
+                len(warmup_state["failed"]))
+
+
+# Function to check whether the warm-up has finished with every cache hot (no task failed)
+def warmup_ready():
+    return warmup_done.is_set() and not warmup_state["failed"]
+
+
+# Function to start the warm-up once per server process, in the background
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    thread = threading.Thread(target=run_warmup, name="pathway-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    run_warmup()